@@ -0,0 +1,25 @@
+"""add rolling summary to chat
+
+Revision ID: add_chat_summary
+Revises: add_indexing_job_kind
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_chat_summary'
+down_revision = 'add_indexing_job_kind'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('chat', sa.Column('summary', sa.Text(), nullable=True))
+    op.add_column('chat', sa.Column('summary_until', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('chat', 'summary_until')
+    op.drop_column('chat', 'summary')
@@ -0,0 +1,23 @@
+"""add summary_until_id to chat
+
+Revision ID: add_chat_summary_until_id
+Revises: add_message_chat_created_index
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_chat_summary_until_id'
+down_revision = 'add_message_chat_created_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('chat', sa.Column('summary_until_id', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('chat', 'summary_until_id')
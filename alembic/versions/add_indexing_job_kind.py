@@ -0,0 +1,23 @@
+"""add kind to indexing jobs
+
+Revision ID: add_indexing_job_kind
+Revises: add_indexing_jobs_table
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_indexing_job_kind'
+down_revision = 'add_indexing_jobs_table'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('indexing_jobs', sa.Column('kind', sa.String(), nullable=False, server_default='index'))
+
+
+def downgrade() -> None:
+    op.drop_column('indexing_jobs', 'kind')
@@ -0,0 +1,40 @@
+"""add indexing jobs table
+
+Revision ID: add_indexing_jobs_table
+Revises: add_subscription_table
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_indexing_jobs_table'
+down_revision = 'add_subscription_table'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('indexing_jobs',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('file_id', sa.String(), nullable=False),
+    sa.Column('from_page', sa.Integer(), nullable=False),
+    sa.Column('to_page', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('chunks_done', sa.Integer(), nullable=False),
+    sa.Column('chunks_total', sa.Integer(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['file_id'], ['document.file_id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_indexing_jobs_file_id'), 'indexing_jobs', ['file_id'], unique=False)
+    op.create_index(op.f('ix_indexing_jobs_status'), 'indexing_jobs', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_indexing_jobs_status'), table_name='indexing_jobs')
+    op.drop_index(op.f('ix_indexing_jobs_file_id'), table_name='indexing_jobs')
+    op.drop_table('indexing_jobs')
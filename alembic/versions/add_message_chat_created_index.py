@@ -0,0 +1,22 @@
+"""add (chat_id, created_at, id) index to message
+
+Revision ID: add_message_chat_created_index
+Revises: add_chat_summary
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'add_message_chat_created_index'
+down_revision = 'add_chat_summary'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_message_chat_id_created_at', 'message', ['chat_id', 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_message_chat_id_created_at', table_name='message')
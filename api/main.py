@@ -4,6 +4,12 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from core.db import init_db
+from assistance.page_extraction import shutdown_extraction_pool
+from assistance.openai_client import close_openai_client
+from assistance.google_search import search_client
+from assistance.document_processor import document_processor_singleton
+from assistance.reembedding import reembedding_scheduler
+from core.config import get_settings
 import os
 from dotenv import load_dotenv
 
@@ -31,12 +37,21 @@ from api.routes.pdf_to_audio import router as pdf_to_audio_router
 from api.routes.librivox import router as librivox_router
 from api.routes.gutenberg import router as gutenberg_router
 from api.routes.subscription import router as subscription_router
+from api.routes.metrics import router as metrics_router
+from api.routes.library import router as library_router
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("Initializing database...")
     await init_db()
     print("Database initialized.")
+    await document_processor_singleton.resume_indexing_jobs()
+    if get_settings().reembedding_enabled:
+        reembedding_scheduler.start()
     yield
+    await reembedding_scheduler.stop()
+    await close_openai_client()
+    await search_client.close()
+    shutdown_extraction_pool()
 
 app = FastAPI(title="Llama4SC API", version="0.1.0", lifespan=lifespan)
 
@@ -83,4 +98,6 @@ app.include_router(audio_chat_router)
 app.include_router(pdf_to_audio_router)
 app.include_router(librivox_router)
 app.include_router(gutenberg_router)
-app.include_router(subscription_router)
\ No newline at end of file
+app.include_router(subscription_router)
+app.include_router(metrics_router)
+app.include_router(library_router)
\ No newline at end of file
@@ -1,6 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
-from typing import List
+from typing import Any, AsyncGenerator, List
 from sqlalchemy.orm import selectinload
 
 from core.db import get_async_session, BookChat, BookChatMessage, Document
@@ -55,6 +58,7 @@ async def get_book_chat(chat_id: str, current_user: User = Depends(get_current_u
 async def add_message_to_book_chat(
     chat_id: str,
     message: ChatMessage,
+    use_cache: bool = Query(True, description="Set to false to bypass the semantic answer cache"),
     current_user: User = Depends(get_current_user),
 ):
     async with get_async_session() as session:
@@ -86,6 +90,7 @@ async def add_message_to_book_chat(
             from_page=start_page,
             to_page=end_page,
             db=session,
+            use_cache=use_cache,
         )
         
         # Save AI message
@@ -110,6 +115,82 @@ async def add_message_to_book_chat(
             sources=sources,
         )
 
+def _sse(event: str, data: Any) -> str:
+    """One Server-Sent Events frame; data is JSON so newlines in tokens are safe."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+async def _stream_book_answer(
+    chat_id: str, file_id: str, question: str, from_page: int, to_page: int, use_cache: bool
+) -> AsyncGenerator[str, None]:
+    """Streams sources, then answer tokens; saves the assistant message when the stream ends."""
+    parts: List[str] = []
+    answer = None
+    try:
+        # The request's session is closed once the response starts, so use our own
+        async with get_async_session() as session:
+            async for event, data in AITeacher().stream_answer(
+                file_id=file_id,
+                question=question,
+                from_page=from_page,
+                to_page=to_page,
+                db=session,
+                use_cache=use_cache,
+            ):
+                if event == "token":
+                    parts.append(data)
+                elif event == "done":
+                    answer = data["answer"]
+                    data = {"confidence": data["confidence"], "cached": data["cached"]}
+                yield _sse(event, data)
+    finally:
+        # Also keep what was generated if the client went away mid-answer
+        content = answer if answer is not None else "".join(parts)
+        if content:
+            await asyncio.shield(_save_assistant_message(chat_id, content))
+
+
+async def _save_assistant_message(chat_id: str, content: str) -> None:
+    async with get_async_session() as session:
+        session.add(BookChatMessage(book_chat_id=chat_id, role="assistant", content=content))
+        await session.commit()
+
+
+@router.post("/{chat_id}/messages/stream")
+async def stream_message_to_book_chat(
+    chat_id: str,
+    message: ChatMessage,
+    use_cache: bool = Query(True, description="Set to false to bypass the semantic answer cache"),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Streaming variant of ``POST /{chat_id}/messages`` as Server-Sent Events.
+
+    Events: ``sources`` (list of chunks), ``token`` (answer text pieces),
+    ``error`` (generation failed) and ``done`` (confidence, cached).
+    """
+    async with get_async_session() as session:
+        result = await session.execute(
+            select(BookChat).where(BookChat.id == chat_id, BookChat.user_id == current_user.id).options(selectinload(BookChat.document))
+        )
+        chat = result.scalar_one_or_none()
+        if not chat:
+            raise HTTPException(status_code=404, detail="Book chat not found")
+
+        session.add(BookChatMessage(book_chat_id=chat_id, role="user", content=message.content))
+        await session.commit()
+
+        start_page = chat.document.processed_from_page or 1
+        end_page = chat.document.processed_to_page or (chat.document.total_pages or start_page)
+        file_id = chat.file_id
+
+    return StreamingResponse(
+        _stream_book_answer(chat_id, file_id, message.content, start_page, end_page, use_cache),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.delete("/{chat_id}", status_code=204)
 async def delete_book_chat(chat_id: str, current_user: User = Depends(get_current_user)):
     async with get_async_session() as session:
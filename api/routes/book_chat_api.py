@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session
-import json
+import asyncio
+import os
 
+from assistance.page_extraction import load_page_texts
 from core.db import get_async_session, Document, BookChat
 from core.book_chat_models import CreateBookChatRequest
 from core.models import BookChatListItem
@@ -24,11 +26,9 @@ async def create_book_chat(
             raise HTTPException(status_code=404, detail="Document not found")
 
         book_text = ""
-        if doc.full_text_path:
-            # Note: This is a synchronous file read, which can block the event loop.
-            # For a production app, consider using aiofiles.
-            with open(doc.full_text_path, "r", encoding="utf-8") as f:
-                book_text = "".join(json.load(f))
+        if doc.full_text_path and os.path.exists(doc.full_text_path):
+            # Pages extracted so far; extraction may still be running in the background
+            book_text = "".join(await asyncio.to_thread(load_page_texts, doc.full_text_path))
         
         chat_name = request.name or f"Chat with {doc.filename}"
 
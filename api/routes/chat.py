@@ -1,5 +1,5 @@
 from typing import Optional, List, AsyncGenerator
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import Session
@@ -7,6 +7,7 @@ from sqlmodel import Session
 from assistance.llama4sc import response_to_user
 from core.chat_db import (
     get_history,
+    get_history_page,
     create_chat,
     list_chats,
     delete_chat,
@@ -61,7 +62,7 @@ async def stream_and_save_response(
     session: AsyncSession,
     chat_id: str,
     user_id: str,
-    history: List[dict],
+    history: Optional[List[dict]],
     user_message: str
 ) -> AsyncGenerator[str, None]:
     """Streams the response and saves the full message at the end."""
@@ -93,16 +94,13 @@ async def general_chat(
         # Add user message
         await add_message(session, chat_id, current_user.id, "user", body.message)
         
-        # Get response from AI
-        history = await get_history(session, chat_id, current_user.id)
-        
-        # Generate response
+        # Generate response (history is assembled inside response_to_user)
         full_response = ""
         async for chunk in response_to_user(
             session=session,
             chat_id=chat_id,
             user_id=current_user.id,
-            history=history,
+            history=None,
             user_message=body.message,
         ):
             full_response += chunk
@@ -122,11 +120,10 @@ async def post_message(
     """Send a user message and receive assistant response as a stream."""
     async with get_async_session() as session:
         await add_message(session, chat_id, current_user.id, "user", body.text)
-        history = await get_history(session, chat_id, current_user.id)
 
         return StreamingResponse(
             stream_and_save_response(
-                session, chat_id, current_user.id, history, body.text
+                session, chat_id, current_user.id, None, body.text
             ),
             media_type="text/event-stream"
         )
@@ -135,11 +132,30 @@ async def post_message(
 @router.get("/chat/{chat_id}/messages", tags=["chat"])
 async def get_messages(
     chat_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
     current_user: User = Depends(get_current_user),
 ):
-    """Retrieve full chat history for a chat_id."""
+    """Retrieve chat history for a chat_id.
+
+    Without parameters the full history is returned as a list (as before).
+    With ``limit`` and/or a cursor it returns one page
+    ``{"messages", "older_cursor", "newer_cursor"}``: the newest messages
+    first, then ``before=<older_cursor>`` for older ones on scroll and
+    ``after=<newer_cursor>`` for newer ones.
+    """
     async with get_async_session() as session:
-        return await get_history(session, chat_id, current_user.id)
+        if limit is None and before is None and after is None:
+            return await get_history(session, chat_id, current_user.id)
+        if before is not None and after is not None:
+            raise HTTPException(status_code=400, detail="Use either 'before' or 'after', not both")
+        try:
+            return await get_history_page(
+                session, chat_id, current_user.id, limit or 50, before=before, after=after
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.post("/chat/new", response_model=CreateChatResponse, tags=["chat"])
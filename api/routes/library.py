@@ -0,0 +1,51 @@
+import asyncio
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlmodel import select
+
+from assistance.concurrency import embedding_limiter
+from assistance.document_processor import document_processor_singleton as document_processor
+from core.auth_utils import get_current_user, User
+from core.db import get_async_session, Document
+
+router = APIRouter(prefix="/api/library")
+
+
+class LibrarySearchHit(BaseModel):
+    file_id: str
+    filename: str | None = None
+    text: str
+    score: float
+
+
+@router.get("/search", response_model=List[LibrarySearchHit], tags=["library"])
+async def search_library(
+    q: str = Query(..., min_length=1, description="Question or search text"),
+    top_k: int = Query(10, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+):
+    """Return the most relevant chunks across all of the user's documents."""
+    try:
+        async with embedding_limiter.slot():
+            query_vec = await asyncio.to_thread(document_processor.embeddings_service.embed_query, q)
+    except Exception as e:
+        # There is no library-wide BM25 index to fall back to
+        print(f"Library search query embedding failed: {e}")
+        raise HTTPException(status_code=503, detail="Embedding service is unavailable, please try again later")
+    if query_vec is None:
+        return []
+    hits = await asyncio.to_thread(document_processor.search_library, current_user.id, query_vec, top_k)
+    if not hits:
+        return []
+
+    async with get_async_session() as session:
+        file_ids = {hit["file_id"] for hit in hits}
+        result = await session.execute(
+            select(Document).where(Document.file_id.in_(file_ids), Document.user_id == current_user.id)
+        )
+        filenames = {doc.file_id: doc.filename for doc in result.scalars().all()}
+
+    # Rows of documents deleted since they were indexed are not returned
+    return [LibrarySearchHit(filename=filenames[hit["file_id"]], **hit) for hit in hits if hit["file_id"] in filenames]
@@ -0,0 +1,43 @@
+from fastapi import APIRouter
+
+from assistance.answer_cache import answer_cache
+from assistance.concurrency import embedding_limiter, llm_limiter
+from assistance.document_processor import document_processor_singleton as document_processor
+from assistance.embedding_store import embedding_store
+from assistance.embeddings import query_embedding_cache
+from assistance.google_search import search_client
+from assistance.reembedding import reembedding_scheduler
+
+router = APIRouter(prefix="/api")
+
+
+@router.get("/metrics/cache", tags=["metrics"])
+async def cache_metrics():
+    """Return hit/miss statistics of the retrieval caches."""
+    return {
+        "embedding_store": embedding_store.stats(),
+        "index_cache": document_processor.index_cache.stats(),
+        "query_embeddings": query_embedding_cache.stats(),
+        "answers": answer_cache.stats(),
+    }
+
+
+@router.get("/metrics/concurrency", tags=["metrics"])
+async def concurrency_metrics():
+    """Return in-flight and queued model API calls with their wait times."""
+    return {
+        "llm": llm_limiter.stats(),
+        "embedding": embedding_limiter.stats(),
+    }
+
+
+@router.get("/metrics/reembedding", tags=["metrics"])
+async def reembedding_metrics():
+    """Return progress of the background migration to the configured embedding model."""
+    return reembedding_scheduler.stats()
+
+
+@router.get("/metrics/search", tags=["metrics"])
+async def search_metrics():
+    """Return cache hit rate, coalesced requests and latency of web search tools."""
+    return search_client.stats()
@@ -1,27 +1,35 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Depends, BackgroundTasks
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Depends
 from sqlmodel import Session
 from core.models import FileUploadResponse
 from assistance.document_processor import document_processor_singleton as document_processor
-from core.db import get_async_session, BookChat
+from assistance.page_extraction import get_extraction_progress
+from assistance.pdf_extractors import EXTRACTORS
+from core.db import get_async_session, BookChat, Document
 from core.auth_utils import get_current_user, User
 import uuid
 from pathlib import Path
+from typing import Optional
 
 router = APIRouter()
 
 @router.post("/upload", response_model=FileUploadResponse)
 async def upload_file(
     file: UploadFile = File(...),
+    extractor: Optional[str] = Query(None, description="PDF backend: auto, pymupdf or pdfplumber"),
     current_user: User = Depends(get_current_user)
 ) -> FileUploadResponse:
+    if extractor is not None and extractor != "auto" and extractor not in EXTRACTORS:
+        raise HTTPException(status_code=400, detail=f"Unknown extractor '{extractor}'")
     file_id = str(uuid.uuid4())
     file_type = file.filename.split('.')[-1].lower()
     upload_dir = Path("uploads")
     upload_dir.mkdir(parents=True, exist_ok=True)
     saved_file_path = upload_dir / f"{file_id}.{file_type}"
     
+    # Copy in chunks so large books are never held in memory whole
     with saved_file_path.open("wb") as buffer:
-        buffer.write(await file.read())
+        while chunk := await file.read(1024 * 1024):
+            buffer.write(chunk)
 
     try:
         async with get_async_session() as session:
@@ -29,7 +37,8 @@ async def upload_file(
                 file_path=str(saved_file_path),
                 filename=file.filename,
                 user_id=current_user.id,
-                db=session
+                db=session,
+                extractor=extractor,
             )
 
             # Create a BookChat for the new document
@@ -57,7 +66,6 @@ async def upload_file(
 @router.post("/process/{file_id}", response_model=FileUploadResponse)
 async def process_document_endpoint(
     file_id: str,
-    background_tasks: BackgroundTasks,
     from_page: int = Query(3, ge=1),
     to_page: int = Query(12, ge=1)
 ):
@@ -71,7 +79,6 @@ async def process_document_endpoint(
                 from_page=from_page,
                 to_page=to_page,
                 db=session,
-                background_tasks=background_tasks
             )
             return FileUploadResponse(
                 file_id=doc_info.file_id,
@@ -89,6 +96,46 @@ async def process_document_endpoint(
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
 
 
+@router.get("/documents/{file_id}/extraction")
+async def extraction_progress(file_id: str):
+    """Progress of background PDF text extraction for a document."""
+    progress = get_extraction_progress(file_id)
+    if progress is None:
+        async with get_async_session() as session:
+            doc = await session.get(Document, file_id)
+        if not doc:
+            raise HTTPException(status_code=404, detail="Document not found")
+        # Finished (or a text file): the document status tells how it ended
+        done = doc.status == "uploaded"
+        progress = {
+            "total_pages": doc.total_pages,
+            "done_pages": doc.total_pages if done else None,
+            "status": "complete" if done else doc.status,
+            "backend": None,
+        }
+    return progress
+
+
+@router.get("/documents/{file_id}/status")
+async def document_status(file_id: str):
+    """Document status with progress of its latest indexing job."""
+    async with get_async_session() as session:
+        doc = await session.get(Document, file_id)
+        if not doc:
+            raise HTTPException(status_code=404, detail="Document not found")
+        job = await document_processor.get_indexing_job(file_id, session)
+        return {
+            "file_id": doc.file_id,
+            "status": doc.status,
+            "processing_status": doc.processing_status,
+            "total_pages": doc.total_pages,
+            "total_chunks": doc.total_chunks,
+            "from_page": doc.processed_from_page,
+            "to_page": doc.processed_to_page,
+            "indexing": job.model_dump(exclude={"file_id"}) if job else None,
+        }
+
+
 @router.get("/documents")
 async def list_documents():
     async with get_async_session() as session:
@@ -1,14 +1,33 @@
-from typing import List, Tuple, Optional
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, List, Tuple, Optional
 import os
-import tiktoken
+
+import numpy as np
 
 import google.generativeai as genai  # type: ignore
 
+from assistance.answer_cache import answer_cache
+from assistance.concurrency import embedding_limiter, llm_limiter
+from assistance.context_selection import select_context
 from assistance.embeddings import EmbeddingsService, Document
+from assistance.token_counter import count_tokens, fit_to_budget
 from core.config import get_settings
 from sqlalchemy.orm import Session
 
 
+@dataclass
+class _Retrieval:
+    """Context found for a question; ``answer`` is set when no generation is needed."""
+
+    sources: List[str] = field(default_factory=list)
+    answer: Optional[str] = None
+    confidence: float = 0.0
+    cached: bool = False
+    scope: Optional[tuple] = None
+    query_vec: Optional[np.ndarray] = None
+
+
 class AITeacher:
     """Service for generating answers to questions based on document context."""
     
@@ -17,10 +36,10 @@ class AITeacher:
         self.settings = get_settings()
         # Настройка Gemini
         genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-        model_name = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
-        self.model = genai.GenerativeModel(model_name)
+        self.model_name = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+        self.model = genai.GenerativeModel(self.model_name)
         
-    def generate_answer(
+    async def generate_answer(
         self,
         question: str,
         context_chunks: List[str],
@@ -44,33 +63,115 @@ class AITeacher:
         context = "\n\n".join(context_chunks)
         
         # Always use OpenAI for answer generation
-        answer, confidence = self._generate_openai_answer(question, context)
+        answer, confidence = await self._generate_openai_answer(question, context)
         
         return answer, confidence
     
-    def _generate_openai_answer(
+    def _build_prompt(self, question: str, context: str) -> str:
+        system = "Ты - дружелюбный и знающий учитель."
+        return (
+            f"{system}\n\n"
+            f"Контекст из учебника:\n{context}\n\n"
+            f"Вопрос студента: {question}\n\n"
+            "Пожалуйста, дай понятный и подробный ответ на вопрос, основываясь на предоставленном контексте. "
+            "Если в контексте нет прямого ответа, постарайся объяснить связанные концепции.\n"
+        )
+
+    async def _generate_openai_answer(
         self, 
         question: str, 
         context: str
     ) -> Tuple[str, float]:
-        """Generate answer using Gemini."""
+        """Generate answer using Gemini without blocking the event loop."""
         try:
-            system = "Ты - дружелюбный и знающий учитель."
-            full_prompt = (
-                f"{system}\n\n"
-                f"Контекст из учебника:\n{context}\n\n"
-                f"Вопрос студента: {question}\n\n"
-                "Пожалуйста, дай понятный и подробный ответ на вопрос, основываясь на предоставленном контексте. "
-                "Если в контексте нет прямого ответа, постарайся объяснить связанные концепции.\n"
-            )
-
-            response = self.model.generate_content(full_prompt)
+            async with llm_limiter.slot():
+                response = await self.model.generate_content_async(self._build_prompt(question, context))
             answer = response.text.strip()
             confidence = 0.9  # предположительно высокий
             return answer, confidence
         except Exception as e:
             return f"Ошибка при генерации ответа: {str(e)}", 0.0
-    
+
+    async def _retrieve(
+        self,
+        file_id: str,
+        question: str,
+        from_page: int,
+        to_page: int,
+        db: Session,
+        use_cache: bool,
+    ) -> _Retrieval:
+        """Find the context for a question, or a final answer (cached or an error message)."""
+        # This part now needs the document_processor to get the embeddings
+        from .document_processor import document_processor_singleton
+        
+        # May read and concatenate index files on a cache miss
+        embeddings_service = await asyncio.to_thread(
+            document_processor_singleton.get_embeddings_service, file_id, from_page, to_page
+        )
+        if not embeddings_service:
+            # Maybe the document exists but is not processed?
+            doc_info = await document_processor_singleton.get_document_info(file_id, db)
+            if doc_info and doc_info.status != "processed":
+                return _Retrieval(answer="Этот документ еще не обработан. Пожалуйста, обработайте его сначала.")
+            return _Retrieval(answer="Не удалось найти обработанные данные для этого документа.")
+
+        mode = self.settings.retrieval_mode
+        query_vec = None
+        if mode != "lexical":
+            try:
+                # The blocking API call runs in a worker thread
+                async with embedding_limiter.slot():
+                    query_vec = await asyncio.to_thread(embeddings_service.embed_query, question)
+            except Exception as e:
+                # Embedding provider slow or down: keep answering from BM25
+                print(f"Query embedding failed, falling back to lexical retrieval: {e}")
+
+        scope = (file_id, from_page, to_page, f"{self.model_name}:{embeddings_service.model_name}")
+        if use_cache and query_vec is not None:
+            cached = answer_cache.lookup(scope, query_vec)
+            if cached is not None:
+                return _Retrieval(
+                    answer=cached.answer, sources=cached.sources, confidence=cached.confidence, cached=True
+                )
+
+        # Gather many similar chunks (up to 100) and trim to token budget
+        if query_vec is None:
+            similar_docs = embeddings_service.search_lexical(question, top_k=100)
+        elif mode == "hybrid" and embeddings_service.lexical is not None:
+            similar_docs = embeddings_service.search_hybrid(question, query_vec, top_k=100)
+        else:
+            similar_docs = embeddings_service.search_by_vector(query_vec, top_k=100)
+
+        if not similar_docs:
+            return _Retrieval(answer="Извините, я не нашел релевантной информации в документе.")
+
+        # Token counts are stored with the index; only in-memory documents get counted here
+        token_counts = [
+            doc.token_count if doc.token_count is not None else count_tokens(doc.text)
+            for doc, _score in similar_docs
+        ]
+        if self.settings.context_selection == "mmr":
+            positions = select_context(
+                similar_docs,
+                token_counts,
+                min(self.settings.context_token_budget, self.settings.max_context_tokens),
+                query_vec=query_vec,
+                mmr_lambda=self.settings.mmr_lambda,
+                duplicate_threshold=self.settings.context_duplicate_threshold,
+            )
+        else:
+            positions = range(fit_to_budget(token_counts, self.settings.max_context_tokens))
+        selected_chunks = [similar_docs[i][0].text for i in positions]
+        return _Retrieval(sources=selected_chunks, scope=scope, query_vec=query_vec)
+
+    def _remember(self, retrieval: _Retrieval, question: str, answer: str, confidence: float) -> None:
+        # Errors come back with zero confidence and must not be served again
+        if confidence > 0 and retrieval.query_vec is not None:
+            answer_cache.store(
+                retrieval.scope, retrieval.query_vec, question, answer, retrieval.sources, confidence
+            )
+
     async def answer_question(
         self,
         file_id: str,
@@ -78,6 +179,7 @@ class AITeacher:
         from_page: int,
         to_page: int,
         db: Session,
+        use_cache: bool = True,
     ) -> Tuple[str, List[str], float]:
         """
         Answer a question using document embeddings.
@@ -88,41 +190,67 @@ class AITeacher:
             from_page: The starting page of the relevant section.
             to_page: The ending page of the relevant section.
             db: The database session.
+            use_cache: Reuse an answer to a near-identical earlier question.
             
         Returns:
             Tuple of (answer, source_chunks, confidence)
         """
-        # This part now needs the document_processor to get the embeddings
-        from .document_processor import document_processor_singleton
-        
-        embeddings_service = document_processor_singleton.get_embeddings_service(file_id, from_page, to_page)
-        if not embeddings_service:
-            # Maybe the document exists but is not processed?
-            doc_info = await document_processor_singleton.get_document_info(file_id, db)
-            if doc_info and doc_info.status != "processed":
-                return "Этот документ еще не обработан. Пожалуйста, обработайте его сначала.", [], 0.0
-            return "Не удалось найти обработанные данные для этого документа.", [], 0.0
-
-        # Gather many similar chunks (up to 100) and trim to token budget
-        similar_docs = embeddings_service.search_similar(question, top_k=100)
+        retrieval = await self._retrieve(file_id, question, from_page, to_page, db, use_cache)
+        if retrieval.answer is not None:
+            return retrieval.answer, retrieval.sources, retrieval.confidence
 
-        if not similar_docs:
-            return "Извините, я не нашел релевантной информации в документе.", [], 0.0
-
-        enc = tiktoken.get_encoding("cl100k_base")
-        max_tokens = self.settings.max_context_tokens
+        # Generate answer using selected context
+        answer, confidence = await self.generate_answer(question, retrieval.sources)
+        self._remember(retrieval, question, answer, confidence)
+        return answer, retrieval.sources, confidence
 
-        selected_chunks: list[str] = []
-        total_tokens = 0
+    async def stream_answer(
+        self,
+        file_id: str,
+        question: str,
+        from_page: int,
+        to_page: int,
+        db: Session,
+        use_cache: bool = True,
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Streaming variant of ``answer_question``.
 
-        for doc, _score in similar_docs:
-            tokens = len(enc.encode(doc.text))
-            if total_tokens + tokens > max_tokens:
-                break
-            selected_chunks.append(doc.text)
-            total_tokens += tokens
+        Yields ``("sources", chunks)`` first, then ``("token", text)`` pieces as
+        Gemini produces them, and finally ``("done", {"answer", "confidence",
+        "cached"})``. A generation failure is reported as ``("error", message)``
+        before ``done``.
+        """
+        retrieval = await self._retrieve(file_id, question, from_page, to_page, db, use_cache)
+        yield "sources", retrieval.sources
+        if retrieval.answer is not None:
+            yield "token", retrieval.answer
+            yield "done", {"answer": retrieval.answer, "confidence": retrieval.confidence, "cached": retrieval.cached}
+            return
+        if not retrieval.sources:
+            answer, _ = await self.generate_answer(question, [])
+            yield "token", answer
+            yield "done", {"answer": answer, "confidence": 0.0, "cached": False}
+            return
 
-        # Generate answer using selected context
-        answer, confidence = self.generate_answer(question, selected_chunks)
+        parts: List[str] = []
+        confidence = 0.9  # как и в generate_answer
+        try:
+            prompt = self._build_prompt(question, "\n\n".join(retrieval.sources))
+            # The slot is held for the whole stream, as the request occupies the API as long
+            async with llm_limiter.slot():
+                response = await self.model.generate_content_async(prompt, stream=True)
+                async for chunk in response:
+                    text = chunk.text
+                    if text:
+                        parts.append(text)
+                        yield "token", text
+        except Exception as e:
+            confidence = 0.0
+            yield "error", f"Ошибка при генерации ответа: {str(e)}"
 
-        return answer, selected_chunks, confidence 
\ No newline at end of file
+        answer = "".join(parts).strip()
+        if not answer:
+            confidence = 0.0
+        self._remember(retrieval, question, answer, confidence)
+        yield "done", {"answer": answer, "confidence": confidence, "cached": False}
@@ -0,0 +1,121 @@
+"""
+Semantic cache of generated answers for document Q&A.
+
+Answers are scoped to (file_id, from_page, to_page, model). A new question
+reuses a stored answer when its embedding is within ``threshold`` cosine
+similarity of a previously answered question in the same scope.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.config import get_settings
+
+AnswerScope = Tuple[str, int, int, str]
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    answer: str
+    sources: List[str]
+    confidence: float
+    expires_at: float
+
+
+class _ScopeEntries:
+    """Question vectors of one scope stacked into a matrix for a single dot product."""
+
+    def __init__(self):
+        self.vectors: np.ndarray | None = None
+        self.answers: List[CachedAnswer] = []
+
+    def prune(self, now: float) -> None:
+        keep = [i for i, a in enumerate(self.answers) if a.expires_at >= now]
+        if len(keep) != len(self.answers):
+            self.answers = [self.answers[i] for i in keep]
+            self.vectors = self.vectors[keep] if keep else None
+
+
+class SemanticAnswerCache:
+    """Per-document answer cache matched by question embedding similarity."""
+
+    def __init__(self, threshold: float, ttl_seconds: float, max_entries_per_scope: int):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries_per_scope = max_entries_per_scope
+        self._scopes: Dict[AnswerScope, _ScopeEntries] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, scope: AnswerScope, query_vec: np.ndarray) -> Optional[CachedAnswer]:
+        """Return the best stored answer above the similarity threshold."""
+        with self._lock:
+            entries = self._scopes.get(scope)
+            if entries is not None:
+                entries.prune(time.time())
+            if entries is None or entries.vectors is None:
+                self.misses += 1
+                return None
+            sims = entries.vectors @ query_vec
+            best = int(np.argmax(sims))
+            if sims[best] < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entries.answers[best]
+
+    def store(
+        self,
+        scope: AnswerScope,
+        query_vec: np.ndarray,
+        question: str,
+        answer: str,
+        sources: List[str],
+        confidence: float,
+    ) -> None:
+        cached = CachedAnswer(question, answer, sources, confidence, time.time() + self.ttl_seconds)
+        with self._lock:
+            entries = self._scopes.setdefault(scope, _ScopeEntries())
+            row = np.asarray(query_vec, dtype=np.float32)[None, :]
+            entries.vectors = row if entries.vectors is None else np.vstack([entries.vectors, row])
+            entries.answers.append(cached)
+            # Drop the oldest answers once a scope is full
+            overflow = len(entries.answers) - self.max_entries_per_scope
+            if overflow > 0:
+                entries.answers = entries.answers[overflow:]
+                entries.vectors = entries.vectors[overflow:]
+
+    def invalidate(self, file_id: str) -> None:
+        """Forget every answer about a document, e.g. after it was reprocessed."""
+        with self._lock:
+            for scope in [s for s in self._scopes if s[0] == file_id]:
+                del self._scopes[scope]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "scopes": len(self._scopes),
+                "entries": sum(len(e.answers) for e in self._scopes.values()),
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_settings = get_settings()
+answer_cache = SemanticAnswerCache(
+    threshold=_settings.answer_cache_threshold,
+    ttl_seconds=_settings.answer_cache_ttl_seconds,
+    max_entries_per_scope=_settings.answer_cache_max_entries_per_scope,
+)
+
+__all__ = ["SemanticAnswerCache", "CachedAnswer", "answer_cache"]
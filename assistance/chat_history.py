@@ -0,0 +1,151 @@
+"""
+Bounded history of a general chat for the model prompt.
+
+A turn sends the chat's stored rolling summary plus the newest messages that
+fit ``chat_history_token_budget``. Only messages newer than the summary are
+read, at most ``chat_history_max_messages`` of them, so DB reads and prompt
+size stay flat however long the chat grows. Messages that fall out of the
+window are folded into the summary by a background task.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from assistance.openai_client import get_openai_client
+from assistance.token_counter import count_tokens_many, fit_to_budget
+from core.chat_db import format_message
+from core.config import get_settings
+from core.db import Chat, Message, get_async_session
+
+SUMMARY_PREFIX = "Краткое содержание предыдущей части диалога:\n"
+
+_SUMMARY_INSTRUCTIONS = (
+    "Ты ведёшь краткое содержание учебного диалога пользователя с ассистентом. "
+    "Обнови его с учётом новых сообщений: сохрани темы, факты о пользователе, "
+    "договорённости и незакрытые вопросы, опусти детали, которые больше не нужны. "
+    "Пиши кратко, на языке диалога, без вступлений."
+)
+
+# Long answers are cut before summarizing, the gist is at the start
+_MAX_SUMMARY_INPUT_CHARS = 4000
+
+# Summary refreshes in progress, by chat id
+_refresh_tasks: Dict[str, asyncio.Task] = {}
+
+
+def _unsummarized(chat: Chat):
+    query = select(Message).where(Message.chat_id == chat.id)
+    if chat.summary_until_id is not None:
+        # Same (created_at, id) order as the history cursor, so equal timestamps are not lost
+        query = query.where(
+            tuple_(Message.created_at, Message.id) > tuple_(chat.summary_until, chat.summary_until_id)
+        )
+    elif chat.summary_until is not None:
+        # Summaries written before the id was stored
+        query = query.where(Message.created_at > chat.summary_until)
+    return query
+
+
+async def _window(session: AsyncSession, chat: Chat) -> Tuple[List[Message], bool]:
+    """Newest messages after the summary that fit the budget (oldest first), and whether any were left out.
+
+    The newest message is always kept, even when it alone exceeds the budget.
+    """
+    settings = get_settings()
+    limit = settings.chat_history_max_messages
+    result = await session.execute(
+        _unsummarized(chat).order_by(Message.created_at.desc(), Message.id.desc()).limit(limit + 1)
+    )
+    newest = result.scalars().all()
+    left_out = len(newest) > limit
+    newest = newest[:limit]
+    keep = fit_to_budget(count_tokens_many([m.content or "" for m in newest]), settings.chat_history_token_budget)
+    if newest:
+        # Dropping the question being answered would leave nothing to reply to
+        keep = max(keep, 1)
+    return list(reversed(newest[:keep])), left_out or keep < len(newest)
+
+
+async def build_history(session: AsyncSession, chat_id: str, user_id: str) -> List[Dict[str, Any]]:
+    """Summary message plus the recent window, formatted for chat completions."""
+    result = await session.execute(select(Chat).where(Chat.id == chat_id, Chat.user_id == user_id))
+    chat = result.scalar_one_or_none()
+    if chat is None:
+        return []
+    window, left_out = await _window(session, chat)
+    if left_out:
+        schedule_summary_refresh(chat_id)
+
+    history: List[Dict[str, Any]] = []
+    if chat.summary:
+        history.append({"role": "system", "content": SUMMARY_PREFIX + chat.summary})
+    for message in window:
+        entry = format_message(message)
+        entry.pop("id", None)
+        history.append(entry)
+    return history
+
+
+async def _summarize(previous: Optional[str], messages: Sequence[Message]) -> str:
+    settings = get_settings()
+    transcript = "\n\n".join(
+        f"{m.role}: {m.content[:_MAX_SUMMARY_INPUT_CHARS]}" for m in messages if m.content
+    )
+    prompt = f"Текущее краткое содержание:\n{previous or '(пусто)'}\n\nНовые сообщения:\n{transcript}"
+    response = await get_openai_client().chat.completions.create(
+        model=settings.chat_summary_model,
+        messages=[
+            {"role": "system", "content": _SUMMARY_INSTRUCTIONS},
+            {"role": "user", "content": prompt},
+        ],
+        temperature=0.2,
+        max_tokens=settings.chat_summary_max_tokens,
+    )
+    return (response.choices[0].message.content or "").strip() or (previous or "")
+
+
+async def _refresh_summary(chat_id: str) -> None:
+    """Fold messages that left the window into the summary, a batch at a time."""
+    settings = get_settings()
+    try:
+        async with get_async_session() as session:
+            while True:
+                chat = await session.get(Chat, chat_id)
+                if chat is None:
+                    return
+                window, left_out = await _window(session, chat)
+                if not left_out:
+                    return
+                # left_out implies a non-empty window; never fold what it still sends
+                query = _unsummarized(chat).where(
+                    tuple_(Message.created_at, Message.id) < tuple_(window[0].created_at, window[0].id)
+                )
+                result = await session.execute(
+                    query.order_by(Message.created_at.asc(), Message.id.asc()).limit(settings.chat_summary_batch_messages)
+                )
+                batch = result.scalars().all()
+                if not batch:
+                    return
+                chat.summary = await _summarize(chat.summary, batch)
+                chat.summary_until = batch[-1].created_at
+                chat.summary_until_id = batch[-1].id
+                await session.commit()
+    except Exception as e:
+        # The next turn schedules another attempt; until then older turns are just left out
+        print(f"Chat summary refresh for {chat_id} failed: {e}")
+    finally:
+        _refresh_tasks.pop(chat_id, None)
+
+
+def schedule_summary_refresh(chat_id: str) -> None:
+    """Start a background summary refresh unless one is already running for the chat."""
+    if chat_id not in _refresh_tasks:
+        _refresh_tasks[chat_id] = asyncio.create_task(_refresh_summary(chat_id))
+
+
+__all__ = ["SUMMARY_PREFIX", "build_history", "schedule_summary_refresh"]
@@ -0,0 +1,89 @@
+"""
+Process-wide limits on concurrent calls to external model APIs.
+
+Requests over the limit wait in FIFO order instead of piling more blocking
+work onto the provider; queue length and wait times are exposed as metrics.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
+
+from core.config import get_settings
+
+
+class ConcurrencyLimiter:
+    """Async semaphore that records how long callers queue for a slot."""
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = max(1, limit)
+        self._semaphore = asyncio.Semaphore(self.limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        waited = time.perf_counter() - queued_at
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        self.in_flight += 1
+        try:
+            yield
+        except BaseException:
+            self.failed += 1
+            raise
+        else:
+            self.completed += 1
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        started = self.completed + self.failed + self.in_flight
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_ms": 1000 * self.total_wait_seconds / started if started else 0.0,
+            "max_wait_ms": 1000 * self.max_wait_seconds,
+        }
+
+
+class RateLimiter:
+    """Caps a long-running job at ``per_minute`` units (e.g. chunks) per minute."""
+
+    def __init__(self, per_minute: int):
+        self.per_minute = max(1, per_minute)
+        self._next_free = 0.0
+
+    async def acquire(self, units: int) -> None:
+        now = time.monotonic()
+        start = max(now, self._next_free)
+        self._next_free = start + 60.0 * units / self.per_minute
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+_settings = get_settings()
+llm_limiter = ConcurrencyLimiter("llm", _settings.llm_max_concurrency)
+embedding_limiter = ConcurrencyLimiter("embedding", _settings.embedding_request_max_concurrency)
+
+__all__ = ["ConcurrencyLimiter", "RateLimiter", "embedding_limiter", "llm_limiter"]
@@ -0,0 +1,73 @@
+"""
+Selection of retrieved chunks for the prompt.
+
+Retrieval returns up to 100 chunks ranked by score alone. On repetitive
+textbooks, and with chunk overlap, many of them say the same thing. This
+stage re-ranks them with maximal marginal relevance (MMR), drops near
+duplicates, and stops at a token budget.
+"""
+from __future__ import annotations
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from assistance.embeddings import Document, normalize_rows
+
+
+def select_context(
+    candidates: Sequence[Tuple[Document, float]],
+    token_counts: Sequence[int],
+    token_budget: int,
+    query_vec: Optional[np.ndarray] = None,
+    mmr_lambda: float = 0.9,
+    duplicate_threshold: float = 0.92,
+) -> List[int]:
+    """
+    Positions of the candidates to send, in MMR order.
+
+    Relevance is the cosine similarity to ``query_vec`` or, without one
+    (lexical retrieval), the retrieval score scaled to [0, 1]. A candidate is
+    dropped when its similarity to an already selected chunk reaches
+    ``duplicate_threshold`` or its text is contained in one. Chunks that do
+    not fit the remaining budget are skipped in favour of smaller ones.
+    """
+    n = len(candidates)
+    if not n:
+        return []
+    vectors = normalize_rows(np.vstack([np.asarray(doc.embedding, dtype=np.float32) for doc, _ in candidates]))
+    if query_vec is not None:
+        relevance = vectors @ np.asarray(query_vec, dtype=np.float32)
+    else:
+        scores = np.asarray([score for _, score in candidates], dtype=np.float32)
+        spread = float(scores.max() - scores.min())
+        relevance = (scores - scores.min()) / spread if spread > 0 else np.ones(n, dtype=np.float32)
+    similarity = vectors @ vectors.T
+    tokens = np.asarray(token_counts, dtype=np.int64)
+
+    available = np.ones(n, dtype=bool)
+    redundancy = np.zeros(n, dtype=np.float32)  # max similarity to the selected chunks
+    selected: List[int] = []
+    used = 0
+    while available.any():
+        mmr = mmr_lambda * relevance - (1 - mmr_lambda) * redundancy
+        mmr[~available] = -np.inf
+        best = int(np.argmax(mmr))
+        available[best] = False
+        if selected and redundancy[best] >= duplicate_threshold:
+            continue
+        if used + tokens[best] > token_budget:
+            continue
+        text = candidates[best][0].text
+        if any(text in candidates[i][0].text or candidates[i][0].text in text for i in selected):
+            continue
+        selected.append(best)
+        used += int(tokens[best])
+        redundancy = np.maximum(redundancy, similarity[best])
+        # Nothing left that could still fit
+        if not (available & (tokens <= token_budget - used)).any():
+            break
+    return selected
+
+
+__all__ = ["select_context"]
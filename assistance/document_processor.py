@@ -1,31 +1,52 @@
 """
 Document processing service for handling file uploads and text extraction.
 """
+import asyncio
+import time
 import uuid
+import weakref
+from collections import Counter
 import json
 import pickle
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from pathlib import Path
+import numpy as np
 from sqlmodel import Session, select
-from fastapi import BackgroundTasks
 
-from assistance.pdf_reader import (
-    extract_text_from_pdf_by_page,
-    extract_text_from_txt,
-    get_pdf_page_count,
-)
+from assistance.pdf_reader import extract_text_from_txt, get_pdf_page_count_from_path
+from assistance.page_extraction import extract_pdf_pages, load_page_texts
 from assistance.text_splitter import split_text_into_chunks
 from assistance.embeddings import EmbeddingsService, Document
+from assistance.answer_cache import answer_cache
+from assistance.embedding_store import embedding_store
+from assistance.index_cache import IndexCache
+from assistance.lexical_index import open_lexical_view, remove_lexical_index
+from assistance.library_index import LibraryRegistry
+from assistance.ttl_cache import TTLCache
+from assistance.page_segments import ConcatDocuments, PageSegmentStore
+from assistance.vector_index import (
+    LazyDocuments,
+    VectorIndex,
+    documents_to_index,
+    index_exists,
+    load_index,
+    remove_index,
+)
 from core.config import get_settings
 from core.models import DocumentInfo
-from core.db import Document as DocumentDB
+from core.db import Document as DocumentDB, IndexingJob, get_async_session
 
 def _get_cache_path(file_id: str, from_page: int, to_page: int) -> Path:
-    """Generate a unique cache path for a document and page range."""
+    """Index base path of a whole-range index written by older versions."""
     cache_dir = Path("cache") / "embeddings"
     cache_dir.mkdir(parents=True, exist_ok=True)
-    return cache_dir / f"{file_id}_{from_page}_{to_page}.pkl"
+    return cache_dir / f"{file_id}_{from_page}_{to_page}"
+
+
+def _get_legacy_cache_path(file_id: str, from_page: int, to_page: int) -> Path:
+    """Path of the pickled index written by older versions."""
+    return _get_cache_path(file_id, from_page, to_page).with_suffix(".pkl")
 
 class DocumentProcessor:
     """Service for processing uploaded documents."""
@@ -34,13 +55,75 @@ class DocumentProcessor:
         """Initialize the document processor."""
         self.settings = get_settings()
         self.embeddings_service = EmbeddingsService(self.settings.embedding_model)
+        # Indexing falls back to this model (e.g. the local one) when the configured one fails
+        fallback = self.settings.embedding_fallback_model
+        self.fallback_embeddings_service = (
+            EmbeddingsService(fallback) if fallback and fallback != self.settings.embedding_model else None
+        )
         self.documents_store: Dict[str, DocumentInfo] = {}
         self.embeddings_store: Dict[str, EmbeddingsService] = {}
-        
+        self.chunk_store = embedding_store
+        self.index_cache = IndexCache(self.settings.index_cache_max_mb * 1024 * 1024)
+        self.library = LibraryRegistry(Path("cache") / "library", nprobe=self.settings.library_nprobe)
+        self.segments = PageSegmentStore(Path("cache") / "embeddings")
+        # One indexing job per document at a time, so pages are never embedded twice;
+        # a lock lives only while a job holds or waits for it
+        self._file_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        # Running page extractions by file_id
+        self._extraction_tasks: Dict[str, asyncio.Task] = {}
+        # Running indexing jobs by job id
+        self._indexing_tasks: Dict[str, asyncio.Task] = {}
+        # Recent queries per document: (count, last access time), ranks re-embedding.
+        # Bounded LRU; a document not queried within the TTL is forgotten.
+        self.access_stats: TTLCache[Tuple[int, float]] = TTLCache(
+            self.settings.access_stats_max_entries, self.settings.access_stats_ttl_seconds
+        )
+
+    async def _embed_chunks(self, chunks: List[str], on_progress=None, throttle=None, service=None):
+        """
+        Embed chunks, reusing vectors already in the shared chunk store.
+
+        Missing chunks are embedded in batches of ``indexing_checkpoint_chunks``
+        and each batch is written to the store before the next one starts, so an
+        interrupted job resumes from its last batch. ``on_progress(n)`` is awaited
+        with the number of chunks finished (found in the store or embedded);
+        ``throttle`` (a ``RateLimiter``) caps how fast batches are sent.
+        ``service`` embeds with another model than the configured one.
+        """
+        service = service or self.embeddings_service
+        model_name = service.model_name
+        embeddings = await asyncio.to_thread(self.chunk_store.get_many, chunks, model_name)
+        if on_progress:
+            await on_progress(sum(emb is not None for emb in embeddings))
+        # Repeated chunks inside one document are embedded only once as well
+        missing_counts = Counter(c for c, emb in zip(chunks, embeddings) if emb is None)
+        missing_texts = list(missing_counts)
+        by_text: Dict[str, np.ndarray] = {}
+        step = max(1, self.settings.indexing_checkpoint_chunks)
+        for start in range(0, len(missing_texts), step):
+            batch = missing_texts[start : start + step]
+            if throttle:
+                await throttle.acquire(len(batch))
+            # Embedding and store writes block, keep them off the event loop
+            new_embeddings = await asyncio.to_thread(service.create_embeddings, batch)
+            await asyncio.to_thread(self.chunk_store.put_many, batch, new_embeddings, model_name)
+            by_text.update(zip(batch, new_embeddings))
+            if on_progress:
+                await on_progress(sum(missing_counts[t] for t in batch))
+        if by_text:
+            embeddings = [emb if emb is not None else by_text[c] for c, emb in zip(chunks, embeddings)]
+        return embeddings
+
     async def save_document(
-        self, file_path: str, filename: str, user_id: str, db: Session
+        self, file_path: str, filename: str, user_id: str, db: Session, extractor: Optional[str] = None
     ) -> DocumentInfo:
-        """Saves the document, extracts full text, and creates a DB record."""
+        """
+        Creates the DB record and starts PDF text extraction in the background.
+
+        PDF pages are extracted by a process pool into ``<file_id>_pages.jsonl``;
+        the document is "extracting" until that finishes. ``extractor`` selects
+        the PDF backend for this document instead of the configured one.
+        """
         file_id = Path(file_path).stem
         file_type = filename.split('.')[-1].lower()
         
@@ -50,13 +133,8 @@ class DocumentProcessor:
         full_text_path = None
         total_pages = None
         if file_type == 'pdf':
-            with open(file_path, "rb") as f:
-                file_content = f.read()
-            total_pages = get_pdf_page_count(file_content)
-            page_texts = extract_text_from_pdf_by_page(file_content)
-            full_text_path = upload_dir / f"{file_id}_full_text.json"
-            with full_text_path.open("w", encoding="utf-8") as f:
-                json.dump(page_texts, f, ensure_ascii=False, indent=2)
+            total_pages = get_pdf_page_count_from_path(file_path)
+            full_text_path = upload_dir / f"{file_id}_pages.jsonl"
         
         db_doc = DocumentDB(
             file_id=file_id,
@@ -65,84 +143,273 @@ class DocumentProcessor:
             file_type=file_type,
             file_path=file_path,
             full_text_path=str(full_text_path) if full_text_path else None,
-            status="uploaded",
+            status="extracting" if file_type == 'pdf' else "uploaded",
             total_pages=total_pages,
         )
         db.add(db_doc)
         await db.commit()
         await db.refresh(db_doc)
 
+        if file_type == 'pdf':
+            self._start_extraction(file_id, file_path, total_pages, full_text_path, extractor)
+
         doc_info = DocumentInfo.model_validate(db_doc.__dict__)
         self.documents_store[file_id] = doc_info
         return doc_info
 
+    def _start_extraction(
+        self, file_id: str, file_path: str, total_pages: int, out_path: Path, extractor: Optional[str]
+    ) -> None:
+        task = asyncio.create_task(self._extract_pages(file_id, file_path, total_pages, out_path, extractor))
+        self._extraction_tasks[file_id] = task
+        task.add_done_callback(lambda _: self._extraction_tasks.pop(file_id, None))
+
+    async def _extract_pages(
+        self, file_id: str, file_path: str, total_pages: int, out_path: Path, extractor: Optional[str]
+    ) -> Optional[str]:
+        """Background extraction; uses its own session since the request's is closed by then.
+
+        Returns the error message if extraction failed.
+        """
+        status, error = "uploaded", None
+        try:
+            await extract_pdf_pages(file_id, file_path, total_pages, out_path, backend=extractor)
+        except Exception as e:
+            print(f"Error extracting text of {file_id}: {e}")
+            status, error = "extraction_failed", str(e)
+        async with get_async_session() as session:
+            db_doc = await session.get(DocumentDB, file_id)
+            if db_doc:
+                db_doc.status = status
+                await session.commit()
+        if file_id in self.documents_store:
+            self.documents_store[file_id].status = status
+        return error
+
+    async def _wait_for_extraction(self, db: Session, db_doc: DocumentDB) -> None:
+        """Wait for the document's page texts; raises if extraction failed or never finished."""
+        task = self._extraction_tasks.get(db_doc.file_id)
+        error = await asyncio.shield(task) if task is not None else None
+        # The extraction task updated the row through its own session
+        await db.refresh(db_doc)
+        if error or db_doc.status == "extraction_failed":
+            raise RuntimeError(f"Text extraction failed: {error}" if error else "Text extraction failed")
+        if db_doc.status == "extracting":
+            raise RuntimeError("Text extraction has not finished")
+
+    def _load_page_texts(self, db_doc: DocumentDB) -> List[str]:
+        """Return the text of every page; a plain text file counts as one page."""
+        if db_doc.file_type == 'pdf':
+            return load_page_texts(db_doc.full_text_path)
+        with open(db_doc.file_path, "rb") as f:
+            return [extract_text_from_txt(f.read())]
+
+    def _split_page(self, text: str) -> List[str]:
+        if self.settings.chunking_mode == "tokens":
+            return split_text_into_chunks(
+                text, self.settings.chunk_size_tokens, self.settings.chunk_overlap_tokens, mode="tokens"
+            )
+        return split_text_into_chunks(text, self.settings.chunk_size, self.settings.chunk_overlap)
+
+    def _clamp_range(self, db_doc: DocumentDB, from_page: int, to_page: int):
+        last_page = db_doc.total_pages if db_doc.file_type == 'pdf' and db_doc.total_pages else 1
+        to_page = min(to_page, last_page)
+        return min(from_page, to_page), to_page
+
     async def process_document_pages(
         self,
         file_id: str,
         from_page: int,
         to_page: int,
         db: Session,
-        background_tasks: BackgroundTasks,
     ) -> DocumentInfo:
         """
         Initiates background processing for a specific page range of a document.
+        Only pages not covered by existing segments are processed, by an
+        ``IndexingJob`` that survives restarts.
         """
         db_doc = await db.get(DocumentDB, file_id)
         if not db_doc:
             raise ValueError("Document not found")
 
-        cache_path = _get_cache_path(file_id, from_page, to_page)
-        if cache_path.exists():
+        from_page, to_page = self._clamp_range(db_doc, from_page, to_page)
+        model_name = self.embeddings_service.model_name
+        missing_runs = await asyncio.to_thread(self.segments.missing_runs, file_id, model_name, from_page, to_page)
+        already_indexed = (
+            not missing_runs
+            or index_exists(_get_cache_path(file_id, from_page, to_page))
+            or _get_legacy_cache_path(file_id, from_page, to_page).exists()
+        )
+        if already_indexed:
+            db_doc.processed_from_page = from_page
+            db_doc.processed_to_page = to_page
             db_doc.processing_status = "complete"
             await db.commit()
             await db.refresh(db_doc)
             return DocumentInfo.model_validate(db_doc.__dict__)
 
+        job = IndexingJob(file_id=file_id, from_page=from_page, to_page=to_page)
+        db.add(job)
         db_doc.processing_status = "processing"
         await db.commit()
         await db.refresh(db_doc)
-        
-        background_tasks.add_task(
-            self._process_and_cache_embeddings,
-            file_id,
-            from_page,
-            to_page,
-            db,
-        )
+
+        # Runs as its own task with its own session; the request's session is closed by then
+        self._start_indexing_job(job.id)
         return DocumentInfo.model_validate(db_doc.__dict__)
 
-    async def _process_and_cache_embeddings(
-        self, file_id: str, from_page: int, to_page: int, db: Session
-    ):
-        """The actual processing logic that runs in the background."""
-        db_doc = await db.get(DocumentDB, file_id)
+    def _start_indexing_job(self, job_id: str) -> None:
+        task = asyncio.create_task(self._run_indexing_job(job_id))
+        self._indexing_tasks[job_id] = task
+        task.add_done_callback(lambda _: self._indexing_tasks.pop(job_id, None))
+
+    async def resume_indexing_jobs(self) -> None:
+        """Restart extractions and indexing jobs that were interrupted by a shutdown."""
+        async with get_async_session() as session:
+            result = await session.execute(select(DocumentDB).where(DocumentDB.status == "extracting"))
+            for doc in result.scalars().all():
+                if doc.file_id not in self._extraction_tasks:
+                    print(f"Resuming text extraction of {doc.file_id}")
+                    self._start_extraction(doc.file_id, doc.file_path, doc.total_pages, Path(doc.full_text_path), None)
+            # Re-embedding jobs are picked up again by the re-embedding scheduler
+            result = await session.execute(
+                select(IndexingJob).where(
+                    IndexingJob.status.in_(["queued", "running"]), IndexingJob.kind == "index"
+                )
+            )
+            for job in result.scalars().all():
+                if job.id not in self._indexing_tasks:
+                    print(f"Resuming indexing job {job.id} for {job.file_id} ({job.chunks_done}/{job.chunks_total})")
+                    self._start_indexing_job(job.id)
+
+    async def get_indexing_job(self, file_id: str, db: Session) -> Optional[IndexingJob]:
+        """Most recent user-requested indexing job of a document."""
+        result = await db.execute(
+            select(IndexingJob)
+            .where(IndexingJob.file_id == file_id, IndexingJob.kind == "index")
+            .order_by(IndexingJob.created_at.desc())
+            .limit(1)
+        )
+        return result.scalars().first()
+
+    def _chunk_pages(self, page_texts: List[str], from_page: int, to_page: int) -> Tuple[List[str], List[int]]:
+        """Chunks of the pages and the page of each chunk (chunks never cross a page boundary)."""
+        chunks: List[str] = []
+        pages: List[int] = []
+        for page in range(from_page, to_page + 1):
+            page_chunks = self._split_page(page_texts[page - 1])
+            chunks.extend(page_chunks)
+            pages.extend([page] * len(page_chunks))
+        return chunks, pages
+
+    async def _add_run(self, db_doc, model_name: str, from_page: int, to_page: int, chunks, embeddings, pages):
+        """Store embedded pages as a segment and add them to the owner's library index."""
+        await asyncio.to_thread(
+            self.segments.add_segment,
+            db_doc.file_id,
+            model_name,
+            (from_page, to_page),
+            chunks,
+            embeddings,
+            pages,
+            dtype=self.settings.embedding_index_dtype,
+        )
         try:
-            text_to_process = ""
-            if db_doc.file_type == 'pdf':
-                with open(db_doc.full_text_path, "r", encoding="utf-8") as f:
-                    page_texts = json.load(f)
-                text_to_process = "\\n".join(page_texts[from_page-1:to_page])
-            elif db_doc.file_type == 'txt':
-                with open(db_doc.file_path, "rb") as f:
-                    text_to_process = extract_text_from_txt(f.read())
-            
-            chunks = split_text_into_chunks(text_to_process, self.settings.chunk_size, self.settings.chunk_overlap)
-            embeddings = self.embeddings_service.create_embeddings(chunks)
-            
-            documents = [Document(id=f"{file_id}_{i}", text=chunk, embedding=embedding) for i, (chunk, embedding) in enumerate(zip(chunks, embeddings))]
-            
-            cache_path = _get_cache_path(file_id, from_page, to_page)
-            with open(cache_path, "wb") as f:
-                pickle.dump(documents, f)
-
-            db_doc.total_chunks = len(chunks)
-            db_doc.processed_from_page = from_page
-            db_doc.processed_to_page = to_page
-            db_doc.processing_status = "complete"
-        except Exception:
-            db_doc.processing_status = "failed"
-        finally:
-            await db.commit()
+            library = self.library.get(db_doc.user_id, model_name)
+            await asyncio.to_thread(library.add, db_doc.file_id, chunks, embeddings)
+        except Exception as e:
+            # The per-document index is usable even if the library update failed
+            print(f"Failed to add {db_doc.file_id} to library index: {e}")
+
+    async def _run_indexing_job(self, job_id: str, throttle=None):
+        """
+        Index the pages of a job that no segment covers yet.
+
+        Progress is committed after every embedding batch and every finished
+        segment. Both are durable (chunk store, segment files), so a restarted
+        job only redoes the batch that was in flight.
+        """
+        async with get_async_session() as db:
+            job = await db.get(IndexingJob, job_id)
+            db_doc = await db.get(DocumentDB, job.file_id)
+            file_id, from_page, to_page = job.file_id, job.from_page, job.to_page
+            model_name = self.embeddings_service.model_name
+            lock = self._file_locks.setdefault(file_id, asyncio.Lock())
+
+            async def checkpoint(done: int = 0):
+                job.chunks_done += done
+                job.updated_at = datetime.utcnow()
+                await db.commit()
+
+            try:
+                async with lock:
+                    job.status = "running"
+                    await checkpoint()
+                    missing_runs = await asyncio.to_thread(
+                        self.segments.missing_runs, file_id, model_name, from_page, to_page
+                    )
+                    if missing_runs:
+                        # Indexing blank pages of a failed extraction would look like success
+                        await self._wait_for_extraction(db, db_doc)
+                    page_texts = await asyncio.to_thread(self._load_page_texts, db_doc) if missing_runs else []
+                    # Chunking is cheap; doing it up front gives the job its total
+                    runs = [(a, b, *self._chunk_pages(page_texts, a, b)) for a, b in missing_runs]
+                    job.chunks_total = sum(len(r[2]) for r in runs)
+                    job.chunks_done = 0
+                    await checkpoint()
+
+                    served_model = model_name
+                    for run_start, run_end, chunks, pages in runs:
+                        try:
+                            embeddings = await self._embed_chunks(chunks, on_progress=checkpoint, throttle=throttle)
+                        except Exception as e:
+                            # Re-embedding just retries later; indexing degrades to the fallback model
+                            if job.kind != "index" or self.fallback_embeddings_service is None:
+                                raise
+                            served_model = self.fallback_embeddings_service.model_name
+                            print(f"Embedding {file_id} failed ({e}), indexing with {served_model} instead")
+                            break
+                        await self._add_run(db_doc, model_name, run_start, run_end, chunks, embeddings, pages)
+
+                    if served_model != model_name:
+                        # The whole range must be covered by one model to be searchable;
+                        # the re-embedding scheduler moves it to the configured model later
+                        fallback = self.fallback_embeddings_service
+                        # Runs already stored with the configured model stay: they are
+                        # covered pages the re-embedding scheduler will not embed again
+                        fallback_runs = await asyncio.to_thread(
+                            self.segments.missing_runs, file_id, served_model, from_page, to_page
+                        )
+                        for run_start, run_end in fallback_runs:
+                            chunks, pages = self._chunk_pages(page_texts, run_start, run_end)
+                            embeddings = await self._embed_chunks(chunks, service=fallback)
+                            await self._add_run(db_doc, served_model, run_start, run_end, chunks, embeddings, pages)
+                        job.chunks_done = job.chunks_total
+
+                # Cached services and answers may still refer to the previous index
+                self.index_cache.invalidate(file_id)
+                answer_cache.invalidate(file_id)
+
+                # Re-embedding migrates pages already processed; the document's range stays as is
+                if job.kind == "index":
+                    # Opens every segment of the range: disk work, off the event loop
+                    db_doc.total_chunks = await asyncio.to_thread(
+                        self.segments.chunk_count, file_id, served_model, from_page, to_page
+                    )
+                    db_doc.processed_from_page = from_page
+                    db_doc.processed_to_page = to_page
+                    db_doc.processing_status = "complete"
+                job.status = "complete"
+            except asyncio.CancelledError:
+                # Shutdown: leave the job "running" so it is resumed on the next start
+                raise
+            except Exception as e:
+                print(f"Indexing job {job_id} for {file_id} failed: {e}")
+                if job.kind == "index":
+                    db_doc.processing_status = "failed"
+                job.status = "failed"
+                job.error = str(e)
+            await checkpoint()
 
     async def get_document_info(self, file_id: str, db: Session) -> Optional[DocumentInfo]:
         """Get information about a document."""
@@ -155,18 +422,123 @@ class DocumentProcessor:
         return None
 
     def get_embeddings_service(self, file_id: str, from_page: int, to_page: int) -> Optional[EmbeddingsService]:
-        """Get embeddings service from cache."""
-        cache_path = _get_cache_path(file_id, from_page, to_page)
-        if not cache_path.exists():
+        """Get embeddings service composed from the page segments of the range."""
+        count, _ = self.access_stats.get(file_id) or (0, 0.0)
+        self.access_stats.set(file_id, (count + 1, time.time()))
+        model_name = self.embeddings_service.model_name
+        key = (file_id, from_page, to_page, model_name)
+        service = self.index_cache.get(key)
+        if service is not None:
+            return service
+
+        parts = self.segments.open_range(file_id, model_name, from_page, to_page)
+        if parts is None:
+            # Not migrated to the configured model yet: serve the newest older model
+            # that covers the range; queries are embedded with that same model
+            for older in reversed(self.segments.models(file_id)):
+                if older != model_name:
+                    parts = self.segments.open_range(file_id, older, from_page, to_page)
+                    if parts is not None:
+                        model_name = older
+                        break
+        if parts is None:
+            parts = self._open_legacy_index(file_id, from_page, to_page)
+            if parts is not None:
+                model_name = parts[0][0].model_name
+        if parts is None:
             return None
-        
-        with open(cache_path, "rb") as f:
-            documents = pickle.load(f)
-        
-        service = EmbeddingsService(self.settings.embedding_model)
-        service.build_index(documents)
+
+        service = self._service_from_parts(parts, model_name)
+        text_bytes = sum(int(ix.offsets[rows.stop] - ix.offsets[rows.start]) for ix, rows in parts)
+        self.index_cache.put(key, service, service.nbytes + text_bytes)
+        return service
+
+    def _service_from_parts(self, parts: List[tuple], model_name: str) -> EmbeddingsService:
+        """Build a search service over segment row slices.
+
+        A single segment is used as a zero-copy view of the memory map; several
+        segments are concatenated once and then kept by the index cache.
+        """
+        service = EmbeddingsService(model_name)
+        if not parts:
+            return service
+
+        def _join(arrays):
+            return arrays[0] if len(arrays) == 1 else np.concatenate(arrays)
+
+        # Compact search copies are only usable if every segment has the same kind
+        search_dtypes = {ix.meta.get("search_dtype", "float32") for ix, _ in parts}
+        use_search = len(search_dtypes) == 1 and "float32" not in search_dtypes
+        documents = [LazyDocuments(ix, rows) for ix, rows in parts]
+        service.build_index_from_matrix(
+            documents[0] if len(documents) == 1 else ConcatDocuments(documents),
+            _join([ix.matrix[rows] for ix, rows in parts]),
+            normalized=all(ix.normalized for ix, _ in parts),
+            search_matrix=_join([ix.search_matrix[rows] for ix, rows in parts]) if use_search else None,
+            search_scales=(
+                _join([ix.search_scales[rows] for ix, rows in parts])
+                if use_search and search_dtypes == {"int8"}
+                else None
+            ),
+        )
+        service.lexical = open_lexical_view([(ix.base, rows) for ix, rows in parts])
         return service
 
+    def _open_legacy_index(self, file_id: str, from_page: int, to_page: int) -> Optional[List[tuple]]:
+        """Whole-range index from before page segments; only usable for its exact range."""
+        cache_path = _get_cache_path(file_id, from_page, to_page)
+        if not index_exists(cache_path):
+            legacy_path = _get_legacy_cache_path(file_id, from_page, to_page)
+            if not legacy_path.exists():
+                return None
+            self._convert_legacy_index(legacy_path, cache_path, file_id)
+        index: VectorIndex = load_index(cache_path)
+        return [(index, slice(0, len(index)))]
+
+    def legacy_indexes(self) -> List[Tuple[str, int, int, str]]:
+        """(file_id, from_page, to_page, model) of whole-range indexes from before page segments."""
+        found: Dict[Tuple[str, int, int], str] = {}
+        root = Path("cache") / "embeddings"
+        for path in root.glob("*_*_*.pkl"):
+            file_id, from_page, to_page = path.stem.rsplit("_", 2)
+            found[(file_id, int(from_page), int(to_page))] = self.settings.legacy_embedding_model
+        for path in root.glob("*_*_*.meta.json"):
+            file_id, from_page, to_page = path.name[: -len(".meta.json")].rsplit("_", 2)
+            with open(path, "r", encoding="utf-8") as f:
+                found[(file_id, int(from_page), int(to_page))] = json.load(f)["model"]
+        return [(*key, model) for key, model in found.items()]
+
+    def remove_model_index(self, user_id: str, file_id: str, model_name: str) -> None:
+        """Delete a document's segments of ``model_name`` and hide them from the owner's library search."""
+        self.segments.remove_model(file_id, model_name)
+        self.library.get(user_id, model_name).remove(file_id)
+
+    def remove_legacy_index(self, file_id: str, from_page: int, to_page: int) -> None:
+        """Delete a whole-range index once page segments cover its pages."""
+        cache_path = _get_cache_path(file_id, from_page, to_page)
+        remove_index(cache_path)
+        remove_lexical_index(cache_path)
+        _get_legacy_cache_path(file_id, from_page, to_page).unlink(missing_ok=True)
+
+    def _convert_legacy_index(self, legacy_path: Path, cache_path: Path, file_id: str) -> None:
+        """One-time migration of a pickle written by this service to the mmap format."""
+        with open(legacy_path, "rb") as f:
+            documents: List[Document] = pickle.load(f)
+        documents_to_index(
+            cache_path,
+            documents,
+            # Pickles carry no model name; they were built with the model configured back then
+            model_name=self.settings.legacy_embedding_model,
+            id_prefix=file_id,
+            dtype=self.settings.embedding_index_dtype,
+        )
+        legacy_path.unlink(missing_ok=True)
+
+    def search_library(self, user_id: str, query_vec: np.ndarray, top_k: int = 10) -> List[Dict]:
+        """Search the top chunks across all documents of a user for a normalized query embedding."""
+        library = self.library.get(user_id, self.embeddings_service.model_name)
+        return library.search(query_vec, top_k)
+
     async def list_documents(self, db: Session) -> List[DocumentInfo]:
         """List all documents from the database."""
         result = await db.execute(select(DocumentDB))
@@ -0,0 +1,171 @@
+"""
+Embedding providers behind ``EmbeddingsService``.
+
+The provider is chosen by the model name, which is also what indexes are
+stamped with, so an index is always queried with the model that built it:
+
+* ``models/...``                – Gemini embedding API (network, API key).
+* ``local/hashed-ngram[-<dim>]`` – deterministic feature hashing of words and
+  character trigrams in NumPy. No network and identical vectors in every
+  process, for offline tests, load tests and degraded-mode indexing.
+"""
+from __future__ import annotations
+
+import os
+import random
+import re
+import time
+import zlib
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import numpy as np
+import google.generativeai as genai  # type: ignore
+from google.api_core import exceptions as google_exceptions  # type: ignore
+
+from core.config import get_settings
+
+# Errors worth retrying: quota throttling and transient backend failures
+_RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+)
+
+LOCAL_MODEL_PREFIX = "local/hashed-ngram"
+_DEFAULT_LOCAL_DIM = 768
+
+_WORD_RE = re.compile(r"\w+")
+
+
+class EmbeddingProvider(ABC):
+    """Turns texts into float32 vectors for one embedding model."""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    @abstractmethod
+    def embed(self, texts: List[str], task_type: str) -> List[np.ndarray]:
+        """Embed texts for indexing; may retry and take its time."""
+
+    @abstractmethod
+    def embed_query(self, query: str, timeout: float | None = None) -> np.ndarray:
+        """Embed one question on the interactive path: short deadline, no retries."""
+
+
+class GeminiEmbeddingProvider(EmbeddingProvider):
+    """Gemini ``embed_content`` in batches, several batches in parallel."""
+
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        settings = get_settings()
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+        self.batch_size = min(max(1, settings.embedding_batch_size), 100)
+        self.max_concurrency = max(1, settings.embedding_max_concurrency)
+        self.max_retries = max(0, settings.embedding_max_retries)
+
+    def _embed_batch(
+        self, texts: List[str], task_type: str, timeout: float | None = None, retries: int | None = None
+    ) -> List[List[float]]:
+        """Embed one batch in a single request, retrying with backoff on throttling."""
+        retries = self.max_retries if retries is None else retries
+        request_options = {"timeout": timeout} if timeout else None
+        delay = 1.0
+        for attempt in range(retries + 1):
+            try:
+                emb_resp = genai.embed_content(
+                    model=self.model_name,
+                    content=texts,
+                    task_type=task_type,
+                    request_options=request_options,
+                )
+                return emb_resp["embedding"]
+            except _RETRYABLE_ERRORS:
+                if attempt == retries:
+                    raise
+                # Exponential backoff with jitter so parallel batches don't retry in lockstep
+                time.sleep(delay + random.uniform(0, delay))
+                delay = min(delay * 2, 30.0)
+        return []
+
+    def embed(self, texts: List[str], task_type: str) -> List[np.ndarray]:
+        if not texts:
+            return []
+        batches = [
+            texts[i : i + self.batch_size] for i in range(0, len(texts), self.batch_size)
+        ]
+        if len(batches) == 1:
+            vectors = self._embed_batch(batches[0], task_type)
+        else:
+            workers = min(self.max_concurrency, len(batches))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                # map() preserves batch order, so vectors line up with the input texts
+                vectors = [v for batch in pool.map(lambda b: self._embed_batch(b, task_type), batches) for v in batch]
+        return [np.array(v, dtype=np.float32) for v in vectors]
+
+    def embed_query(self, query: str, timeout: float | None = None) -> np.ndarray:
+        vector = self._embed_batch([query], "retrieval_query", timeout=timeout, retries=0)[0]
+        return np.array(vector, dtype=np.float32)
+
+
+class HashedNgramEmbeddingProvider(EmbeddingProvider):
+    """
+    Signed feature hashing of words, word bigrams and character trigrams.
+
+    Each feature is hashed (CRC32, stable across processes unlike ``hash()``)
+    to one of ``dim`` buckets with a ±1 sign, i.e. a sparse random projection
+    of the n-gram counts. Texts sharing vocabulary get similar vectors, which
+    is enough to exercise and load-test retrieval, not to replace a real model.
+    """
+
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        suffix = model_name[len(LOCAL_MODEL_PREFIX) :].lstrip("-")
+        self.dim = int(suffix) if suffix else _DEFAULT_LOCAL_DIM
+        if self.dim <= 0:
+            raise ValueError(f"Invalid dimension in embedding model name '{model_name}'")
+
+    def _features(self, text: str) -> List[str]:
+        words = _WORD_RE.findall(text.casefold())
+        features = [f"w:{w}" for w in words]
+        features.extend(f"b:{a} {b}" for a, b in zip(words, words[1:]))
+        for word in words:
+            padded = f" {word} "
+            features.extend(f"c:{padded[i : i + 3]}" for i in range(len(padded) - 2))
+        return features
+
+    def _vector(self, text: str) -> np.ndarray:
+        features = self._features(text)
+        if not features:
+            return np.zeros(self.dim, dtype=np.float32)
+        hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.uint32, count=len(features))
+        buckets = (hashes % self.dim).astype(np.int64)
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+        vector = np.bincount(buckets, weights=signs, minlength=self.dim).astype(np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed(self, texts: List[str], task_type: str) -> List[np.ndarray]:
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, query: str, timeout: float | None = None) -> np.ndarray:
+        return self._vector(query)
+
+
+def get_provider(model_name: str) -> EmbeddingProvider:
+    """Provider that produces vectors of ``model_name``."""
+    if model_name.startswith(LOCAL_MODEL_PREFIX):
+        return HashedNgramEmbeddingProvider(model_name)
+    return GeminiEmbeddingProvider(model_name)
+
+
+__all__ = [
+    "EmbeddingProvider",
+    "GeminiEmbeddingProvider",
+    "HashedNgramEmbeddingProvider",
+    "LOCAL_MODEL_PREFIX",
+    "get_provider",
+]
@@ -0,0 +1,118 @@
+"""
+Content-addressed store of chunk embeddings shared by all documents.
+
+Vectors are keyed by a hash of (embedding model, normalized chunk text), so the
+same chunk is embedded only once no matter which upload or page range it
+comes from.
+"""
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+def normalize_chunk_text(text: str) -> str:
+    """Normalize text so that cosmetic whitespace differences share one key."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def chunk_key(text: str, model_name: str) -> str:
+    """Return the store key for a chunk embedded with the given model."""
+    payload = f"{model_name}\0{normalize_chunk_text(text)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+class EmbeddingStore:
+    """Persistent SQLite-backed chunk embedding store with hit/miss counters."""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunk_embeddings ("
+                " key TEXT PRIMARY KEY,"
+                " model TEXT NOT NULL,"
+                " dim INTEGER NOT NULL,"
+                " vector BLOB NOT NULL)"
+            )
+        return self._conn
+
+    def get_many(self, texts: Sequence[str], model_name: str) -> List[Optional[np.ndarray]]:
+        """Return stored vectors in input order, None for chunks not seen before."""
+        keys = [chunk_key(t, model_name) for t in texts]
+        found: Dict[str, np.ndarray] = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            conn = self._connection()
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(unique_keys), 500):
+                batch = unique_keys[i : i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT key, vector FROM chunk_embeddings WHERE key IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).copy()
+
+            vectors = [found.get(k) for k in keys]
+            hit_count = sum(v is not None for v in vectors)
+            self.hits += hit_count
+            self.misses += len(vectors) - hit_count
+        return vectors
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence[np.ndarray], model_name: str) -> None:
+        """Persist vectors for the given chunks."""
+        rows = []
+        for text, vec in zip(texts, vectors):
+            arr = np.asarray(vec, dtype=np.float32)
+            rows.append((chunk_key(text, model_name), model_name, int(arr.shape[0]), arr.tobytes()))
+        if not rows:
+            return
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO chunk_embeddings (key, model, dim, vector) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters and number of stored vectors."""
+        with self._lock:
+            entries = self._connection().execute(
+                "SELECT COUNT(*) FROM chunk_embeddings"
+            ).fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+            }
+
+
+# Global store shared by all document processing jobs
+embedding_store = EmbeddingStore(Path("cache") / "embeddings" / "chunks.sqlite3")
+
+__all__ = [
+    "EmbeddingStore",
+    "embedding_store",
+    "chunk_key",
+    "normalize_chunk_text",
+]
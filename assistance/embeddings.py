@@ -1,18 +1,71 @@
 """
-Embeddings service relying on OpenAI Embedding API. No local ML dependencies.
+Embeddings service: vector and BM25 search over document chunks.
+
+Vectors come from the provider of the service's model (see
+``assistance.embedding_providers``): the Gemini API or the local
+deterministic hashed n-gram model.
 """
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List, Tuple
+from typing import TYPE_CHECKING, List, Sequence, Tuple
 
-# Google Gemini embedding
 import numpy as np
-import os
-import google.generativeai as genai  # type: ignore
 
+from assistance.embedding_providers import get_provider
+from assistance.ttl_cache import TTLCache
 from core.config import get_settings
 
+if TYPE_CHECKING:
+    from assistance.lexical_index import LexicalView
+
+# Reciprocal-rank fusion constant (Cormack et al.)
+_RRF_K = 60
+
+# Rows scored per block when the search matrix has to be upcast to float32
+_SCORE_BLOCK_ROWS = 16384
+
+_settings = get_settings()
+# Query embeddings shared by every EmbeddingsService instance, keyed by
+# (normalized question, model); repeated questions skip the network call.
+query_embedding_cache: TTLCache[np.ndarray] = TTLCache(
+    _settings.query_cache_max_entries, _settings.query_cache_ttl_seconds
+)
+
+
+def normalize_query(query: str) -> str:
+    """Casefold and collapse whitespace so trivially different questions share a key."""
+    return " ".join(query.casefold().split())
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Return a float32 copy of ``matrix`` with L2-normalized rows."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def quantize_int8(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 quantization; returns (codes, float32 row scales)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    scales = np.abs(matrix).max(axis=1) / 127.0 if len(matrix) else np.zeros(0, np.float32)
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the ``k`` largest scores in descending order, O(N) selection."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
 
 @dataclass
 class Document:
@@ -21,70 +74,171 @@ class Document:
     id: str
     text: str
     embedding: np.ndarray
+    # Context tokens of ``text``, stored with the index (None if unknown)
+    token_count: int | None = None
 
 
 class EmbeddingsService:
-    """Service that creates and searches embeddings via OpenAI API."""
+    """Service that creates and searches embeddings."""
 
     def __init__(self, model_name: str | None = None):
         settings = get_settings()
-        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
         # default embedding model for Gemini
         self.model_name = model_name or "models/embedding-001"
+        self.provider = get_provider(self.model_name)
+        self.rescore_factor = max(1, settings.embedding_rescore_factor)
+        self.query_timeout = settings.embedding_query_timeout_seconds
 
-        self.documents: List[Document] = []
+        self.documents: Sequence[Document] = []
         self.embeddings_matrix: np.ndarray | None = None  # shape: (N, dim)
+        # Optional compact float16/int8 copy used for the first scoring pass
+        self.search_matrix: np.ndarray | None = None
+        self.search_scales: np.ndarray | None = None
+        self.normalized = False
+        self._doc_norms: np.ndarray | None = None
+        # Optional BM25 index over the same documents, in the same order
+        self.lexical: LexicalView | None = None
 
     # ---------------------------------------------------------------------
     # Creation helpers
     # ---------------------------------------------------------------------
-    def _gemini_embed(self, texts: List[str], task_type: str) -> List[List[float]]:
-        """Call Gemini embedding model for each text."""
-        vectors: List[List[float]] = []
-        for t in texts:
-            emb_resp = genai.embed_content(model=self.model_name, content=t, task_type=task_type)
-            vectors.append(emb_resp["embedding"])
-        return vectors
-
     def create_embeddings(self, texts: List[str]) -> List[np.ndarray]:
-        """Create embeddings for list of texts via OpenAI."""
-        vectors = self._gemini_embed(texts, task_type="retrieval_document")
-        return [np.array(v, dtype=np.float32) for v in vectors]
+        """Create embeddings for list of texts with the model's provider."""
+        return self.provider.embed(texts, task_type="retrieval_document")
 
     # ---------------------------------------------------------------------
     # Index helpers
     # ---------------------------------------------------------------------
     def build_index(self, documents: List[Document]):
-        """Store documents and pre-build concatenated numpy matrix for fast search."""
+        """Store documents and pre-build a normalized numpy matrix for fast search."""
+        matrix = normalize_rows(np.vstack([doc.embedding for doc in documents]))
+        self.build_index_from_matrix(documents, matrix, normalized=True)
+
+    def build_index_from_matrix(
+        self,
+        documents: Sequence[Document],
+        matrix: np.ndarray,
+        normalized: bool = False,
+        search_matrix: np.ndarray | None = None,
+        search_scales: np.ndarray | None = None,
+    ):
+        """Use an existing (possibly memory-mapped) matrix without copying it.
+
+        ``search_matrix`` is an optional float16/int8 copy of ``matrix`` (with
+        per-row ``search_scales`` for int8); the top candidates it yields are
+        rescored against the full-precision ``matrix``.
+        """
         self.documents = documents
-        self.embeddings_matrix = np.vstack([doc.embedding for doc in documents]).astype(
-            np.float32
-        )
-        # Pre-compute row norms as 2-D column vector to keep broadcasting compatible
-        self._doc_norms = np.linalg.norm(self.embeddings_matrix, axis=1, keepdims=True)
-        self._doc_norms[self._doc_norms == 0] = 1e-10  # avoid div-by-zero
+        self.embeddings_matrix = matrix
+        self.normalized = normalized
+        self.search_matrix = search_matrix
+        self.search_scales = search_scales
+        # Legacy indexes are not normalized; their norms are computed on first search
+        self._doc_norms = None
+
+    def _row_norms(self) -> np.ndarray:
+        if self._doc_norms is None:
+            norms = np.linalg.norm(self.embeddings_matrix, axis=1).astype(np.float32)
+            norms[norms == 0] = 1e-10  # avoid div-by-zero
+            self._doc_norms = norms
+        return self._doc_norms
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of the arrays touched on every query."""
+        hot = self.search_matrix if self.search_matrix is not None else self.embeddings_matrix
+        total = hot.nbytes if hot is not None else 0
+        if self.search_scales is not None:
+            total += self.search_scales.nbytes
+        return int(total)
 
     # ---------------------------------------------------------------------
     # Search
     # ---------------------------------------------------------------------
-    def search_similar(self, query: str, top_k: int = 3) -> List[Tuple[Document, float]]:
+    def embed_query(self, query: str) -> np.ndarray | None:
+        """Return the L2-normalized query embedding, or None for a zero vector."""
+        key = (normalize_query(query), self.model_name)
+        cached = query_embedding_cache.get(key)
+        if cached is not None:
+            return cached
+
+        # Interactive path: short deadline and no retries, callers fall back to BM25
+        query_vec = self.provider.embed_query(query, timeout=self.query_timeout)
+        query_norm = np.linalg.norm(query_vec)
+        if query_norm == 0:
+            return None
+        query_vec /= query_norm
+        # Callers must not modify the shared cached array
+        query_vec.setflags(write=False)
+        query_embedding_cache.set(key, query_vec)
+        return query_vec
+
+    def _score(self, query_vec: np.ndarray) -> np.ndarray:
+        """First-pass cosine scores for every row."""
+        if self.search_matrix is None:
+            sims = self.embeddings_matrix @ query_vec
+            if not self.normalized:
+                sims = sims / self._row_norms()
+            return sims
+
+        # Upcast the compact matrix block by block to bound temporary memory
+        n = self.search_matrix.shape[0]
+        sims = np.empty(n, dtype=np.float32)
+        for start in range(0, n, _SCORE_BLOCK_ROWS):
+            block = self.search_matrix[start : start + _SCORE_BLOCK_ROWS].astype(np.float32)
+            sims[start : start + len(block)] = block @ query_vec
+        if self.search_scales is not None:
+            sims *= self.search_scales
+        return sims
+
+    def _rank(self, query_vec: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Positions and cosine scores of the ``top_k`` best rows."""
+        sims = self._score(query_vec)
+        if self.search_matrix is None:
+            top_indices = top_k_indices(sims, top_k)
+            return top_indices, sims[top_indices]
+
+        # Rescore a few times more candidates than needed at full precision
+        # (sorted indices keep reads from the memory-mapped matrix sequential)
+        candidates = np.sort(top_k_indices(sims, top_k * self.rescore_factor))
+        exact = np.asarray(self.embeddings_matrix[candidates], dtype=np.float32) @ query_vec
+        order = top_k_indices(exact, top_k)
+        return candidates[order], exact[order]
+
+    def search_by_vector(self, query_vec: np.ndarray, top_k: int = 3) -> List[Tuple[Document, float]]:
+        """Top-k documents for a normalized query vector."""
         if self.embeddings_matrix is None or not self.documents:
             return []
+        top_indices, scores = self._rank(query_vec, top_k)
+        return [(self.documents[int(i)], float(score)) for i, score in zip(top_indices, scores)]
 
-        query_vec = np.array(
-            self._gemini_embed([query], task_type="retrieval_query")[0], dtype=np.float32
-        )
-        query_norm = np.linalg.norm(query_vec)
-        if query_norm == 0:
+    def search_lexical(self, query: str, top_k: int = 3) -> List[Tuple[Document, float]]:
+        """BM25 search; needs no embedding call."""
+        if self.lexical is None or not self.documents:
             return []
-        query_vec /= query_norm
+        return [(self.documents[i], score) for i, score in self.lexical.search(query, top_k)]
 
-        # Normalize matrix rows once
-        normalized_matrix = self.embeddings_matrix / self._doc_norms
-        # Cosine similarity = dot product as both sides are L2-normalised
-        sims = normalized_matrix @ query_vec
-        top_indices = sims.argsort()[-top_k:][::-1]
-        results: List[Tuple[Document, float]] = [
-            (self.documents[i], float(sims[i])) for i in top_indices
-        ]
-        return results 
\ No newline at end of file
+    def search_hybrid(
+        self, query: str, query_vec: np.ndarray, top_k: int = 3
+    ) -> List[Tuple[Document, float]]:
+        """Fuse dense and BM25 rankings with reciprocal-rank fusion."""
+        if self.embeddings_matrix is None or not self.documents:
+            return []
+        dense_positions = [int(i) for i in self._rank(query_vec, top_k)[0]]
+        lexical_positions = [i for i, _ in self.lexical.search(query, top_k)] if self.lexical else []
+
+        fused: dict[int, float] = {}
+        for ranking in (dense_positions, lexical_positions):
+            for rank, pos in enumerate(ranking):
+                fused[pos] = fused.get(pos, 0.0) + 1.0 / (_RRF_K + rank + 1)
+        best = sorted(fused.items(), key=lambda item: -item[1])[:top_k]
+        return [(self.documents[pos], score) for pos, score in best]
+
+    def search_similar(self, query: str, top_k: int = 3) -> List[Tuple[Document, float]]:
+        if self.embeddings_matrix is None or not self.documents:
+            return []
+
+        query_vec = self.embed_query(query)
+        if query_vec is None:
+            return []
+        return self.search_by_vector(query_vec, top_k)
@@ -1,11 +1,114 @@
+"""
+Google Custom Search for the chat agent tools.
+
+Every agent shares one ``SearchClient``: a pooled async HTTP client, a TTL
+cache of results keyed by (query, search type) and single-flight
+coalescing, so identical questions from many students cost one API call
+per TTL instead of one per tool call.
+"""
+from __future__ import annotations
+
+import asyncio
 import os
+import time
+from typing import Any, Dict, Hashable, Optional
+
+import httpx
 from dotenv import load_dotenv
-import requests
+
+from assistance.ttl_cache import TTLCache
+from core.config import get_settings
 
 load_dotenv()
 api_key = os.getenv("GEMINI_API_KEY")
 cx_id = os.getenv("GOOGLE_CX_ID")
 
+SEARCH_URL = "https://www.googleapis.com/customsearch/v1"
+
+
+class SearchClient:
+    """Cached, coalescing Custom Search requests with hit-rate and latency counters."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, timeout_seconds: float):
+        self.cache: TTLCache[list] = TTLCache(max_entries, ttl_seconds)
+        self.timeout_seconds = timeout_seconds
+        self._http: Optional[httpx.AsyncClient] = None
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.requests = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.total_request_seconds = 0.0
+        self.max_request_seconds = 0.0
+
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=self.timeout_seconds)
+        return self._http
+
+    async def _request(self, params: Dict[str, str]) -> list:
+        started = time.perf_counter()
+        self.requests += 1
+        try:
+            response = await self._client().get(SEARCH_URL, params=params)
+            response.raise_for_status()
+            data = response.json()
+            if "error" in data:
+                raise Exception(data["error"]["message"])
+            return data.get("items", [])
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.total_request_seconds += elapsed
+            self.max_request_seconds = max(self.max_request_seconds, elapsed)
+
+    async def fetch(self, key: Hashable, params: Dict[str, str]) -> list:
+        """Items for ``params``; ``key`` identifies equivalent requests."""
+        items = self.cache.get(key)
+        if items is not None:
+            return items
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._request(params))
+            self._inflight[key] = task
+
+            def _done(t: asyncio.Task) -> None:
+                self._inflight.pop(key, None)
+                # Failures are not cached, the next call tries again
+                if not t.cancelled() and t.exception() is None:
+                    self.cache.set(key, t.result())
+
+            task.add_done_callback(_done)
+        else:
+            self.coalesced += 1
+        # A caller that times out must not cancel the request others wait for
+        return await asyncio.shield(task)
+
+    async def close(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cache": self.cache.stats(),
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+            "errors": self.errors,
+            "avg_request_ms": 1000 * self.total_request_seconds / self.requests if self.requests else 0.0,
+            "max_request_ms": 1000 * self.max_request_seconds,
+        }
+
+
+_settings = get_settings()
+search_client = SearchClient(
+    _settings.google_search_cache_max_entries,
+    _settings.google_search_cache_ttl_seconds,
+    _settings.google_search_timeout_seconds,
+)
+
 
 class GoogleSearchAgent:
     def __init__(self, api_key: str = api_key, cx_id: str = cx_id):
@@ -14,40 +117,24 @@ class GoogleSearchAgent:
         if not self.api_key or not self.cx:
             raise ValueError("GEMINI_API_KEY и GOOGLE_CX_ID должны быть установлены")
 
-    def search(self, query: str) -> list[dict]:
-        url = "https://www.googleapis.com/customsearch/v1"
+    async def _search(self, query: str, search_type: Optional[str] = None) -> list[dict]:
         params = {
             "key": self.api_key,
             "cx": self.cx,
             "q": query,
             "safe": "off"
         }
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
+        if search_type:
+            params["searchType"] = search_type
+        # Trivially different spellings of a question share one cache entry
+        key = (self.cx, " ".join(query.casefold().split()), search_type)
+        return await search_client.fetch(key, params)
 
-        if "error" in data:
-            raise Exception(data["error"]["message"])
+    async def search(self, query: str) -> list[dict]:
+        return await self._search(query)
 
-        return data.get("items", [])
-
-    def search_images(self, query: str) -> list[dict]:
+    async def search_images(self, query: str) -> list[dict]:
         """
         Выполняет поиск только по изображениям.
         """
-        url = "https://www.googleapis.com/customsearch/v1"
-        params = {
-            "key": self.api_key,
-            "cx": self.cx,
-            "q": query,
-            "searchType": "image",  # Ключевой параметр для поиска изображений
-            "safe": "off"
-        }
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        if "error" in data:
-            raise Exception(data["error"]["message"])
-
-        return data.get("items", [])
+        return await self._search(query, search_type="image")  # Ключевой параметр для поиска изображений
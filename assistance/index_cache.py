@@ -0,0 +1,83 @@
+"""
+In-process LRU cache of loaded ``EmbeddingsService`` indexes.
+
+Entries are keyed by (file_id, from_page, to_page, model) and evicted in
+least-recently-used order once their total size exceeds a byte budget.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+from assistance.embeddings import EmbeddingsService
+
+IndexKey = Tuple[str, int, int, str]
+
+
+class IndexCache:
+    """Byte-budgeted LRU of hot document indexes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[EmbeddingsService, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: IndexKey) -> Optional[EmbeddingsService]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: IndexKey, service: EmbeddingsService, nbytes: int) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            if nbytes > self.max_bytes:
+                # Larger than the whole budget: serve it but don't keep it
+                return
+            self._entries[key] = (service, nbytes)
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+                self.evictions += 1
+
+    def invalidate(self, file_id: str) -> int:
+        """Drop every cached range of a document; returns number of entries removed."""
+        with self._lock:
+            stale = [k for k in self._entries if k[0] == file_id]
+            for key in stale:
+                _, nbytes = self._entries.pop(key)
+                self.current_bytes -= nbytes
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+__all__ = ["IndexCache", "IndexKey"]
@@ -0,0 +1,167 @@
+"""
+Persistent BM25 inverted index stored next to a dense ``vector_index``.
+
+Files for base path ``<name>``:
+
+* ``<name>.terms.json``        – sorted vocabulary
+* ``<name>.post_offsets.npy``  – int64 start of every term's postings (V+1)
+* ``<name>.post_rows.npy``     – int32 row ids, ascending within each term
+* ``<name>.post_tf.npy``       – int32 term frequencies aligned with rows
+* ``<name>.doc_len.npy``       – int64 cumulative token counts per row (N+1)
+
+Because postings are sorted by row, BM25 statistics can be computed for any
+contiguous row slice, which is how page ranges are served from segments.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens; works for Cyrillic and Latin text alike."""
+    return _TOKEN_RE.findall(text.casefold())
+
+
+def _paths(base: Path) -> Dict[str, Path]:
+    return {
+        "terms": base.with_name(base.name + ".terms.json"),
+        "offsets": base.with_name(base.name + ".post_offsets.npy"),
+        "rows": base.with_name(base.name + ".post_rows.npy"),
+        "tf": base.with_name(base.name + ".post_tf.npy"),
+        "doc_len": base.with_name(base.name + ".doc_len.npy"),
+    }
+
+
+def lexical_index_exists(base: Path) -> bool:
+    return _paths(base)["terms"].exists()
+
+
+def write_lexical_index(base: Path, texts: Sequence[str]) -> None:
+    """Build the inverted index for chunk ``texts`` (row i = texts[i])."""
+    paths = _paths(base)
+    postings: Dict[str, List[Tuple[int, int]]] = {}
+    lengths = np.zeros(len(texts) + 1, dtype=np.int64)
+    for row, text in enumerate(texts):
+        tokens = tokenize(text)
+        lengths[row + 1] = len(tokens)
+        for term, tf in Counter(tokens).items():
+            postings.setdefault(term, []).append((row, tf))
+
+    terms = sorted(postings)
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(postings[t]) for t in terms])
+    rows = np.fromiter((r for t in terms for r, _ in postings[t]), dtype=np.int32, count=int(offsets[-1]))
+    tfs = np.fromiter((f for t in terms for _, f in postings[t]), dtype=np.int32, count=int(offsets[-1]))
+
+    tmp = {k: p.with_name(p.name + ".tmp") for k, p in paths.items()}
+    for key, array in (("offsets", offsets), ("rows", rows), ("tf", tfs), ("doc_len", np.cumsum(lengths))):
+        with open(tmp[key], "wb") as f:
+            np.save(f, array)
+    with open(tmp["terms"], "w", encoding="utf-8") as f:
+        json.dump(terms, f, ensure_ascii=False)
+    # The vocabulary is written last and marks the index as complete
+    for key in ("offsets", "rows", "tf", "doc_len", "terms"):
+        os.replace(tmp[key], paths[key])
+
+
+def remove_lexical_index(base: Path) -> None:
+    for path in _paths(base).values():
+        path.unlink(missing_ok=True)
+
+
+class LexicalIndex:
+    """Memory-mapped BM25 index of one segment."""
+
+    def __init__(self, base: Path):
+        paths = _paths(base)
+        with open(paths["terms"], "r", encoding="utf-8") as f:
+            self.term_ids = {term: i for i, term in enumerate(json.load(f))}
+        self.offsets = np.load(paths["offsets"], mmap_mode="r")
+        self.rows = np.load(paths["rows"], mmap_mode="r")
+        self.tf = np.load(paths["tf"], mmap_mode="r")
+        self.cum_len = np.load(paths["doc_len"])
+
+    def postings(self, term: str, rows: slice) -> Tuple[np.ndarray, np.ndarray]:
+        """Row ids and term frequencies of ``term`` restricted to a row slice."""
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            return np.empty(0, np.int32), np.empty(0, np.int32)
+        start, end = int(self.offsets[term_id]), int(self.offsets[term_id + 1])
+        term_rows = self.rows[start:end]
+        lo = int(np.searchsorted(term_rows, rows.start, side="left"))
+        hi = int(np.searchsorted(term_rows, rows.stop, side="left"))
+        return np.asarray(term_rows[lo:hi]), np.asarray(self.tf[start + lo : start + hi])
+
+    def doc_lengths(self, rows: slice) -> np.ndarray:
+        return np.diff(self.cum_len[rows.start : rows.stop + 1])
+
+
+class LexicalView:
+    """BM25 search over row slices of several segments, numbered like the dense index."""
+
+    def __init__(self, parts: Sequence[Tuple[LexicalIndex, slice]]):
+        self.parts = list(parts)
+        self._starts = np.cumsum([0] + [p[1].stop - p[1].start for p in self.parts])
+
+    def search(self, query: str, top_k: int) -> List[Tuple[int, float]]:
+        """Return (document position, BM25 score) pairs, best first."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        total_docs = int(self._starts[-1])
+        if not terms or not total_docs:
+            return []
+
+        lengths = [ix.doc_lengths(rows) for ix, rows in self.parts]
+        avgdl = max(float(sum(l.sum() for l in lengths)) / total_docs, 1.0)
+        scores = np.zeros(total_docs, dtype=np.float32)
+        for term in terms:
+            hits = [ix.postings(term, rows) for ix, rows in self.parts]
+            df = sum(len(r) for r, _ in hits)
+            if not df:
+                continue
+            idf = np.log(1.0 + (total_docs - df + 0.5) / (df + 0.5))
+            for (ix, rows), (term_rows, tf), part_lengths, part_start in zip(
+                self.parts, hits, lengths, self._starts
+            ):
+                if not len(term_rows):
+                    continue
+                local = term_rows - rows.start
+                dl = part_lengths[local]
+                tf = tf.astype(np.float32)
+                denom = tf + BM25_K1 * (1 - BM25_B + BM25_B * dl / avgdl)
+                scores[part_start + local] += idf * tf * (BM25_K1 + 1) / denom
+
+        nonzero = np.flatnonzero(scores)
+        if not len(nonzero):
+            return []
+        best = nonzero[np.argsort(-scores[nonzero], kind="stable")[:top_k]]
+        return [(int(i), float(scores[i])) for i in best]
+
+
+def open_lexical_view(parts: Sequence[Tuple[Path, slice]]) -> Optional[LexicalView]:
+    """Lexical view over (index base, rows) parts, or None if any part lacks an index."""
+    if not parts or not all(lexical_index_exists(base) for base, _ in parts):
+        return None
+    return LexicalView([(LexicalIndex(base), rows) for base, rows in parts])
+
+
+__all__ = [
+    "LexicalIndex",
+    "LexicalView",
+    "lexical_index_exists",
+    "open_lexical_view",
+    "remove_lexical_index",
+    "tokenize",
+    "write_lexical_index",
+]
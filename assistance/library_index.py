@@ -0,0 +1,305 @@
+"""
+Per-user approximate nearest neighbour index over all of a user's documents.
+
+An IVF (inverted file) index in plain NumPy: rows are L2-normalized chunk
+embeddings, clustered with spherical k-means into ``nlist`` lists. A query is
+compared to the centroids first and only the rows of the ``nprobe`` closest
+lists are scored exactly, so search cost grows with ``nprobe * N / nlist``
+rather than with the library size.
+
+Storage under ``cache/library/<user_id>/<model>/`` is append-only:
+
+* ``vectors.f32`` – raw float32 rows
+* ``lists.i32``   – IVF list of every row (-1 until the first training)
+* ``files.i32``   – index into ``meta.json["files"]`` for every row
+* ``offsets.i64`` / ``texts.bin`` – end offsets and UTF-8 chunk texts
+* ``keys.txt``    – (file_id, chunk hash) keys, so re-indexing a range adds nothing
+* ``centroids.npy`` and ``meta.json``
+
+Removing a document only marks its ``meta.json["files"]`` entry as null; search
+skips its rows and the space is reclaimed when the index is rebuilt.
+"""
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import math
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from assistance.embedding_store import normalize_chunk_text
+from assistance.embeddings import normalize_rows, top_k_indices
+from assistance.vector_index import model_slug
+
+# Below this many rows a brute-force scan is as fast as probing lists
+_MIN_TRAIN_ROWS = 2048
+# Retrain once the library has grown this much since the last training
+_RETRAIN_GROWTH = 4
+_KMEANS_ITERATIONS = 10
+_ASSIGN_BLOCK_ROWS = 16384
+
+
+def _spherical_kmeans(sample: np.ndarray, nlist: int, seed: int = 0) -> np.ndarray:
+    """Cluster normalized rows by cosine similarity; returns normalized centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+    for _ in range(_KMEANS_ITERATIONS):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        counts = np.bincount(assign, minlength=nlist)
+        empty = counts == 0
+        # Re-seed empty clusters with random rows
+        if empty.any():
+            sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+class LibraryIndex:
+    """IVF index of one user's chunks for a single embedding model."""
+
+    def __init__(self, root: Path, nprobe: int = 8):
+        self.root = Path(root)
+        self.nprobe = nprobe
+        self._lock = threading.Lock()
+        self._meta_mtime: int | None = None
+        self.meta: Dict = {"dim": None, "count": 0, "files": [], "trained_count": 0}
+        self._keys: set[str] | None = None
+        self._centroids: np.ndarray | None = None
+        self._lists: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    # ------------------------------------------------------------------
+    # Storage helpers
+    # ------------------------------------------------------------------
+    def _path(self, name: str) -> Path:
+        return self.root / name
+
+    @contextmanager
+    def _file_lock(self):
+        """Serialize writers across worker processes."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self._path(".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refresh(self) -> None:
+        """Reload metadata when another process has changed the index."""
+        meta_path = self._path("meta.json")
+        if not meta_path.exists():
+            return
+        mtime = meta_path.stat().st_mtime_ns
+        if mtime == self._meta_mtime:
+            return
+        with open(meta_path, "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self._meta_mtime = mtime
+        self._keys = None
+        self._lists = None
+        centroids_path = self._path("centroids.npy")
+        self._centroids = np.load(centroids_path) if centroids_path.exists() else None
+
+    def _write_meta(self) -> None:
+        tmp = self._path("meta.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, self._path("meta.json"))
+        self._meta_mtime = self._path("meta.json").stat().st_mtime_ns
+
+    def _array(self, name: str, dtype, shape) -> np.ndarray:
+        if not shape[0]:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(self._path(name), dtype=dtype, mode="r", shape=shape)
+
+    def _vectors(self) -> np.ndarray:
+        return self._array("vectors.f32", np.float32, (self.meta["count"], self.meta["dim"] or 0))
+
+    def _row_lists(self) -> np.ndarray:
+        return self._array("lists.i32", np.int32, (self.meta["count"],))
+
+    def _load_keys(self) -> set[str]:
+        if self._keys is None:
+            keys_path = self._path("keys.txt")
+            self._keys = set(keys_path.read_text().split()) if keys_path.exists() else set()
+        return self._keys
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        out = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), _ASSIGN_BLOCK_ROWS):
+            block = np.asarray(vectors[start : start + _ASSIGN_BLOCK_ROWS], dtype=np.float32)
+            out[start : start + len(block)] = np.argmax(block @ self._centroids.T, axis=1)
+        return out
+
+    def _train(self) -> None:
+        """(Re)build centroids from a sample and reassign every row."""
+        count = self.meta["count"]
+        nlist = int(min(4096, max(16, math.sqrt(count))))
+        vectors = self._vectors()
+        rng = np.random.default_rng(count)
+        sample_size = min(count, 64 * nlist)
+        sample = np.asarray(vectors[np.sort(rng.choice(count, size=sample_size, replace=False))])
+        self._centroids = _spherical_kmeans(sample, nlist)
+        np.save(self._path("centroids.npy"), self._centroids)
+        self._assign(vectors).tofile(self._path("lists.i32"))
+        self.meta["trained_count"] = count
+        self.meta["nlist"] = nlist
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def add(self, file_id: str, texts: Sequence[str], vectors: Sequence[np.ndarray]) -> int:
+        """Append a document's chunks; returns the number of new rows."""
+        with self._lock, self._file_lock():
+            self._refresh()
+            keys = self._load_keys()
+            new_rows = []
+            for text, vec in zip(texts, vectors):
+                digest = hashlib.sha1(normalize_chunk_text(text).encode("utf-8")).hexdigest()
+                key = f"{file_id}:{digest}"
+                if key not in keys:
+                    keys.add(key)
+                    new_rows.append((key, text, vec))
+            if not new_rows:
+                return 0
+
+            matrix = normalize_rows(np.vstack([v for _, _, v in new_rows]))
+            if self.meta["dim"] is None:
+                self.meta["dim"] = int(matrix.shape[1])
+            if file_id not in self.meta["files"]:
+                self.meta["files"].append(file_id)
+            file_idx = self.meta["files"].index(file_id)
+
+            encoded = [t.encode("utf-8") for _, t, _ in new_rows]
+            texts_path = self._path("texts.bin")
+            base_offset = texts_path.stat().st_size if texts_path.exists() else 0
+            offsets = base_offset + np.cumsum([len(b) for b in encoded], dtype=np.int64)
+            lists = self._assign(matrix) if self._centroids is not None else np.full(len(matrix), -1, np.int32)
+
+            with open(self._path("vectors.f32"), "ab") as f:
+                f.write(matrix.tobytes())
+            with open(self._path("lists.i32"), "ab") as f:
+                f.write(lists.astype(np.int32).tobytes())
+            with open(self._path("files.i32"), "ab") as f:
+                f.write(np.full(len(matrix), file_idx, dtype=np.int32).tobytes())
+            with open(self._path("offsets.i64"), "ab") as f:
+                f.write(offsets.tobytes())
+            with open(texts_path, "ab") as f:
+                f.write(b"".join(encoded))
+            with open(self._path("keys.txt"), "a") as f:
+                f.write("".join(f"{k}\n" for k, _, _ in new_rows))
+
+            self.meta["count"] += len(matrix)
+            trained = self.meta["trained_count"]
+            if self.meta["count"] >= _MIN_TRAIN_ROWS and (
+                not trained or self.meta["count"] >= _RETRAIN_GROWTH * trained
+            ):
+                self._train()
+            self._lists = None
+            self._write_meta()
+            return len(matrix)
+
+    def remove(self, file_id: str) -> bool:
+        """Hide a document's rows from search; returns whether it was indexed."""
+        with self._lock, self._file_lock():
+            self._refresh()
+            if file_id not in self.meta["files"]:
+                return False
+            self.meta["files"][self.meta["files"].index(file_id)] = None
+            prefix = f"{file_id}:"
+            self._keys = {k for k in self._load_keys() if not k.startswith(prefix)}
+            tmp = self._path("keys.txt.tmp")
+            tmp.write_text("".join(f"{k}\n" for k in self._keys))
+            os.replace(tmp, self._path("keys.txt"))
+            self._write_meta()
+            return True
+
+    def _inverted_lists(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Row ids grouped by IVF list plus the start offset of each list."""
+        if self._lists is None:
+            row_lists = np.asarray(self._row_lists())
+            order = np.argsort(row_lists, kind="stable").astype(np.int64)
+            starts = np.searchsorted(row_lists[order], np.arange(self.meta["nlist"] + 1))
+            self._lists = (order, starts)
+        return self._lists
+
+    def _text(self, row: int) -> str:
+        offsets = self._array("offsets.i64", np.int64, (self.meta["count"],))
+        start = int(offsets[row - 1]) if row else 0
+        with open(self._path("texts.bin"), "rb") as f:
+            f.seek(start)
+            return f.read(int(offsets[row]) - start).decode("utf-8")
+
+    def search(self, query_vec: np.ndarray, top_k: int = 10) -> List[Dict]:
+        """Top chunks across all documents for a normalized query vector."""
+        with self._lock:
+            self._refresh()
+            if not self.meta["count"]:
+                return []
+            vectors = self._vectors()
+            if self._centroids is None:
+                candidates = np.arange(self.meta["count"])
+            else:
+                order, starts = self._inverted_lists()
+                probe = top_k_indices(self._centroids @ query_vec, self.nprobe)
+                candidates = np.sort(np.concatenate([order[starts[c] : starts[c + 1]] for c in probe]))
+            file_rows = self._array("files.i32", np.int32, (self.meta["count"],))
+            live = np.array([f is not None for f in self.meta["files"]], dtype=bool)
+            if not live.all():
+                candidates = candidates[live[np.asarray(file_rows[candidates])]]
+            if not len(candidates):
+                return []
+
+            scores = np.asarray(vectors[candidates], dtype=np.float32) @ query_vec
+            best = top_k_indices(scores, top_k)
+            results = []
+            for i in best:
+                row = int(candidates[i])
+                results.append(
+                    {
+                        "file_id": self.meta["files"][int(file_rows[row])],
+                        "text": self._text(row),
+                        "score": float(scores[i]),
+                    }
+                )
+            return results
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._refresh()
+            return {
+                "rows": self.meta["count"],
+                "documents": sum(f is not None for f in self.meta["files"]),
+                "nlist": self.meta.get("nlist", 0),
+                "trained_rows": self.meta["trained_count"],
+            }
+
+
+class LibraryRegistry:
+    """Lazily opened library indexes, one per (user, embedding model)."""
+
+    def __init__(self, root: Path, nprobe: int = 8):
+        self.root = Path(root)
+        self.nprobe = nprobe
+        self._indexes: Dict[Tuple[str, str], LibraryIndex] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str, model_name: str) -> LibraryIndex:
+        key = (user_id, model_name)
+        with self._lock:
+            if key not in self._indexes:
+                self._indexes[key] = LibraryIndex(
+                    self.root / user_id / model_slug(model_name), nprobe=self.nprobe
+                )
+            return self._indexes[key]
+
+
+__all__ = ["LibraryIndex", "LibraryRegistry"]
@@ -1,15 +1,19 @@
 import os
 import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from openai import OpenAI
 from typing import List, Dict, Any, Optional, AsyncGenerator
 from sqlalchemy.ext.asyncio import AsyncSession
 
 # Импортируем нашего агента поиска
 from .google_search import GoogleSearchAgent
+from .openai_client import get_openai_client
 from .txt_to_image import generate_image_from_prompt
 from core.image_db import save_image_record
-from core.chat_db import add_message, get_history
+from core.chat_db import add_message
+from .chat_history import build_history
+from core.config import get_settings
 
 load_dotenv()
 
@@ -19,32 +23,29 @@ openai_api_key = os.getenv("OPENAI_API_KEY")
 if not openai_api_key:
     raise ValueError("Не найден ключ OPENAI_API_KEY")
 
-# Убираем base_url, чтобы использовать API OpenAI по умолчанию
-client = OpenAI(api_key=openai_api_key)
-
 # --- Клиент Google Search ---
 google_api_key = os.getenv("GOOGLE_API_KEY")
 google_cx_id = os.getenv("GOOGLE_CX_ID")
 search_agent = GoogleSearchAgent(api_key=google_api_key, cx_id=google_cx_id)
 
-def search_google(query: str) -> str:
+async def search_google(query: str) -> str:
     """
     Выполняет поиск в Google и возвращает результаты в формате JSON.
     Используется, когда нужна актуальная информация или данные из интернета.
     """
     print(f"--- Выполняется поиск по запросу: {query} ---")
-    results = search_agent.search(query)
+    results = await search_agent.search(query)
     # Возвращаем только заголовки и ссылки для экономии токенов
     simplified_results = [{"title": item.get("title"), "link": item.get("link")} for item in results[:5]]
     return json.dumps(simplified_results, ensure_ascii=False)
 
-def search_google_images(query: str) -> str:
+async def search_google_images(query: str) -> str:
     """
     Ищет изображения в Google по запросу. Используется, когда пользователь просит найти или показать изображение.
     Возвращает список URL-адресов изображений.
     """
     print(f"--- Выполняется поиск изображений по запросу: {query} ---")
-    results = search_agent.search_images(query)
+    results = await search_agent.search_images(query)
     # Возвращаем только прямые ссылки на изображения
     image_urls = [item.get("link") for item in results[:5] if item.get("link")]
     return json.dumps(image_urls, ensure_ascii=False)
@@ -121,6 +122,72 @@ tools = [
     }
 ]
 
+available_functions = {
+    "search_google": search_google,
+    "search_google_images": search_google_images,
+    "generate_image_tool": generate_image_tool,
+}
+
+_settings = get_settings()
+# Блокирующие инструменты (Vertex AI) выполняются в отдельном пуле потоков,
+# чтобы зависший инструмент не занимал потоки, нужные остальному приложению
+_tool_executor = ThreadPoolExecutor(max_workers=_settings.tool_max_workers, thread_name_prefix="chat-tool")
+tool_timeouts = {
+    "search_google": _settings.tool_timeout_seconds,
+    "search_google_images": _settings.tool_timeout_seconds,
+    "generate_image_tool": _settings.image_tool_timeout_seconds,
+}
+
+
+def _merge_tool_call_deltas(tool_calls: Dict[int, Dict[str, Any]], deltas) -> None:
+    """Собирает вызовы инструментов из фрагментов стрима (аргументы приходят по частям)."""
+    for delta in deltas:
+        call = tool_calls.setdefault(
+            delta.index, {"id": "", "type": "function", "function": {"name": "", "arguments": ""}}
+        )
+        if delta.id:
+            call["id"] = delta.id
+        if delta.function:
+            if delta.function.name:
+                call["function"]["name"] += delta.function.name
+            if delta.function.arguments:
+                call["function"]["arguments"] += delta.function.arguments
+
+
+async def _run_tool(tool_call: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Runs one tool call off the event loop with its own timeout.
+
+    Always returns the tool message: failures and timeouts are reported to
+    the model as an error result instead of failing the whole turn.
+    """
+    function_name = tool_call["function"]["name"]
+    timeout = tool_timeouts.get(function_name, _settings.tool_timeout_seconds)
+    try:
+        function_to_call = available_functions[function_name]
+        function_args = json.loads(tool_call["function"]["arguments"] or "{}")
+        if asyncio.iscoroutinefunction(function_to_call):
+            call = function_to_call(**function_args)
+        else:
+            # On timeout the await is cancelled; the worker thread finishes on its own
+            # and its result is dropped
+            loop = asyncio.get_running_loop()
+            call = loop.run_in_executor(_tool_executor, lambda: function_to_call(**function_args))
+        content = await asyncio.wait_for(call, timeout)
+    except asyncio.TimeoutError:
+        print(f"--- Инструмент {function_name} не ответил за {timeout} с ---")
+        content = json.dumps({"status": "error", "message": f"Инструмент не ответил за {timeout:.0f} секунд."}, ensure_ascii=False)
+    except Exception as e:
+        print(f"--- Ошибка инструмента {function_name}: {e} ---")
+        content = json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
+    return {
+        "tool_call_id": tool_call["id"],
+        "role": "tool",
+        "name": function_name,
+        "content": content,
+    }
+
+
 async def response_to_user(
     session: AsyncSession,
     chat_id: str,
@@ -132,12 +199,15 @@ async def response_to_user(
     """
     Yields chunks of AI response for a new user message.
     """
-    # Получаем историю диалога из базы данных, теперь с user_id
-    db_history = await get_history(session, chat_id, user_id)
+    # История из БД: краткое содержание старых сообщений + последние сообщения в пределах бюджета токенов
+    db_history = await build_history(session, chat_id, user_id)
     if db_history:
         history = db_history
     else:
         history = history or []
+    # Текущее сообщение уже сохранено вызывающим кодом, оно добавляется ниже (вместе с изображением)
+    if history and history[-1]["role"] == "user" and history[-1].get("content") == user_message:
+        history = history[:-1]
 
     content: List[Dict[str, Any]] = []
     
@@ -162,8 +232,9 @@ async def response_to_user(
 
     model_to_use = "gpt-4o"
     
+    client = get_openai_client()
     # First request to the model with streaming enabled
-    stream = client.chat.completions.create(
+    stream = await client.chat.completions.create(
         model=model_to_use,
         messages=messages_for_ai,
         tools=tools,
@@ -172,14 +243,14 @@ async def response_to_user(
     )
     
     full_response_content = ""
-    tool_calls = []
-    for chunk in stream:
+    tool_calls: Dict[int, Dict[str, Any]] = {}
+    async for chunk in stream:
         delta = chunk.choices[0].delta
         if delta.content:
             full_response_content += delta.content
             yield delta.content
         if delta.tool_calls:
-            tool_calls.extend(delta.tool_calls)
+            _merge_tool_call_deltas(tool_calls, delta.tool_calls)
 
     if tool_calls:
         # This part will not stream the final response, but the tool usage itself is not a streaming operation.
@@ -188,37 +259,21 @@ async def response_to_user(
         print("--- Модель решила использовать инструмент ---")
         
         # We need the full response message with tool calls to proceed
-        response_message = {"role": "assistant", "content": full_response_content, "tool_calls": tool_calls}
+        calls = [tool_calls[i] for i in sorted(tool_calls)]
+        response_message = {"role": "assistant", "content": full_response_content, "tool_calls": calls}
         messages_for_ai.append(response_message)
-        
-        available_functions = {
-            "search_google": search_google,
-            "search_google_images": search_google_images,
-            "generate_image_tool": generate_image_tool,
-        }
-        
-        for tool_call in tool_calls:
-            function_name = tool_call.function.name
-            function_to_call = available_functions[function_name]
-            function_args = json.loads(tool_call.function.arguments)
-            function_response = function_to_call(**function_args)
-            
-            messages_for_ai.append(
-                {
-                    "tool_call_id": tool_call.id,
-                    "role": "tool",
-                    "name": function_name,
-                    "content": function_response,
-                }
-            )
-        
+
+        # All tool calls of the turn run concurrently; a slow one costs at most its
+        # own timeout, and closing the stream cancels the pending ones
+        messages_for_ai.extend(await asyncio.gather(*(_run_tool(call) for call in calls)))
+
         # Second request to get the final, synthesized response
-        second_response_stream = client.chat.completions.create(
+        second_response_stream = await client.chat.completions.create(
             model=model_to_use,
             messages=messages_for_ai,
             stream=True
         )
         
-        for chunk in second_response_stream:
+        async for chunk in second_response_stream:
             if chunk.choices[0].delta.content:
                 yield chunk.choices[0].delta.content
@@ -0,0 +1,62 @@
+"""
+Process-wide async OpenAI client for the chat pipeline.
+
+One ``AsyncOpenAI`` over one pooled ``httpx.AsyncClient``: streams wait for
+tokens without blocking the event loop, connections are reused between
+requests, and every phase of a request has a deadline, so a stalled stream
+fails instead of hanging a chat forever.
+"""
+from __future__ import annotations
+
+import os
+from typing import Optional
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from core.config import get_settings
+
+_client: Optional[AsyncOpenAI] = None
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """Shared client, created on first use."""
+    global _client
+    if _client is None:
+        settings = get_settings()
+        api_key = os.getenv("OPENAI_API_KEY") or settings.openai_api_key
+        if not api_key:
+            raise ValueError("Не найден ключ OPENAI_API_KEY")
+        timeout = httpx.Timeout(
+            connect=settings.openai_connect_timeout_seconds,
+            # Longest silence allowed between two chunks of a stream
+            read=settings.openai_read_timeout_seconds,
+            write=settings.openai_connect_timeout_seconds,
+            pool=settings.openai_pool_timeout_seconds,
+        )
+        http_client = DefaultAsyncHttpxClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=settings.openai_max_connections,
+                max_keepalive_connections=settings.openai_max_keepalive_connections,
+            ),
+        )
+        _client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=settings.openai_base_url,
+            http_client=http_client,
+            timeout=timeout,
+            max_retries=settings.openai_max_retries,
+        )
+    return _client
+
+
+async def close_openai_client() -> None:
+    """Close pooled connections; called when the application shuts down."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+__all__ = ["close_openai_client", "get_openai_client"]
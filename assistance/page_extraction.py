@@ -0,0 +1,123 @@
+"""
+Background PDF text extraction spread over a process pool.
+
+Pages are extracted in batches by worker processes and appended to a JSON
+Lines file (``{"page": n, "text": ...}`` per line) as soon as each batch is
+done, so the upload request never waits for a long book to be parsed and a
+progress counter is available while it runs.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from assistance.pdf_extractors import choose_extractor, get_extractor
+from assistance.pdf_reader import extract_pages_from_path
+from core.config import get_settings
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # Forking the threaded server process can deadlock workers on inherited locks
+        _executor = ProcessPoolExecutor(
+            max_workers=get_settings().pdf_extraction_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+@dataclass
+class ExtractionProgress:
+    total_pages: int
+    done_pages: int = 0
+    status: str = "running"  # finished extractions report the document status instead
+    backend: Optional[str] = None
+
+
+# Progress of extractions running in this process, keyed by file_id; an entry is
+# removed when its extraction ends and the document status takes over
+extraction_progress: Dict[str, ExtractionProgress] = {}
+
+
+def load_page_texts(path: str) -> List[str]:
+    """Read page texts written by ``extract_pdf_pages`` (or the older JSON list)."""
+    if not path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    pages: Dict[int, str] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                pages[record["page"]] = record["text"]
+    # Pages may arrive out of order; missing ones (still running) read as empty
+    return [pages.get(n, "") for n in range(1, max(pages, default=0) + 1)]
+
+
+async def extract_pdf_pages(
+    file_id: str, pdf_path: str, total_pages: int, out_path: Path, backend: Optional[str] = None
+) -> None:
+    """
+    Extract every page of ``pdf_path`` into ``out_path``, batch by batch.
+
+    ``backend`` overrides the ``pdf_extractor`` setting; "auto" samples the
+    document to pick one (see ``pdf_extractors.choose_extractor``). Raises if
+    any page could not be extracted; callers record the outcome on the document.
+    """
+    progress = extraction_progress.setdefault(file_id, ExtractionProgress(total_pages))
+    try:
+        await _extract_pdf_pages(progress, pdf_path, total_pages, out_path, backend)
+    finally:
+        extraction_progress.pop(file_id, None)
+
+
+async def _extract_pdf_pages(
+    progress: ExtractionProgress, pdf_path: str, total_pages: int, out_path: Path, backend: Optional[str]
+) -> None:
+    settings = get_settings()
+    batch = max(1, settings.pdf_extraction_batch_pages)
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    backend = backend or settings.pdf_extractor
+    if backend == "auto":
+        backend = await loop.run_in_executor(executor, choose_extractor, pdf_path)
+    get_extractor(backend)
+    progress.backend = backend
+
+    async def run_batch(start: int):
+        end = min(start + batch, total_pages)
+        return start, await loop.run_in_executor(executor, extract_pages_from_path, pdf_path, start, end, backend)
+
+    futures = [asyncio.ensure_future(run_batch(start)) for start in range(0, total_pages, batch)]
+    try:
+        with open(out_path, "w", encoding="utf-8") as out:
+            for fut in asyncio.as_completed(futures):
+                start, texts = await fut
+                for offset, text in enumerate(texts):
+                    out.write(json.dumps({"page": start + offset + 1, "text": text}, ensure_ascii=False) + "\n")
+                out.flush()
+                progress.done_pages += len(texts)
+    finally:
+        # On failure or cancellation (shutdown) drop the batches still queued
+        for fut in futures:
+            fut.cancel()
+
+
+def get_extraction_progress(file_id: str) -> Optional[dict]:
+    progress = extraction_progress.get(file_id)
+    return asdict(progress) if progress else None
+
+
+def shutdown_extraction_pool() -> None:
+    """Stop worker processes; called when the application shuts down."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
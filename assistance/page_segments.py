@@ -0,0 +1,264 @@
+"""
+Page-granular index segments of a document.
+
+Every processing job indexes only the pages that no existing segment covers
+and stores them as a new segment (a ``vector_index`` with a ``pages`` array).
+Any page range is then served by slicing the segments that cover it, so
+widening a range from 12 to 60 pages embeds just the 48 new pages. Each
+segment also gets a BM25 ``lexical_index`` over the same rows.
+
+Segments are stamped with the embedding model and dimension that produced
+them, so several models can coexist while documents are re-embedded.
+
+Layout::
+
+    cache/embeddings/<file_id>/manifest.json
+    cache/embeddings/<file_id>/<model>/<segment>.{vectors,pages,offsets,...}
+"""
+from __future__ import annotations
+
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from assistance.lexical_index import remove_lexical_index, write_lexical_index
+from assistance.vector_index import (
+    LazyDocuments,
+    VectorIndex,
+    index_exists,
+    load_index,
+    model_slug,
+    remove_index,
+    write_index,
+)
+
+PageRange = Tuple[int, int]
+
+# Merge a document's segments into one once it has more than this many
+_MAX_SEGMENTS = 8
+
+
+def _merge_ranges(ranges: Sequence[Sequence[int]]) -> List[PageRange]:
+    merged: List[PageRange] = []
+    for start, end in sorted((int(a), int(b)) for a, b in ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class PageSegmentStore:
+    """Manifest-driven collection of page segments for every document."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    # ------------------------------------------------------------------
+    # Manifest
+    # ------------------------------------------------------------------
+    def _manifest_path(self, file_id: str) -> Path:
+        return self.root / file_id / "manifest.json"
+
+    def _segment_base(self, file_id: str, model_name: str, name: str) -> Path:
+        return self.root / file_id / model_slug(model_name) / name
+
+    def load_manifest(self, file_id: str) -> List[Dict]:
+        path = self._manifest_path(file_id)
+        if not path.exists():
+            return []
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["segments"]
+
+    def _save_manifest(self, file_id: str, segments: List[Dict]) -> None:
+        path = self._manifest_path(file_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"segments": segments}, f)
+        os.replace(tmp, path)
+
+    def segments(self, file_id: str, model_name: str) -> List[Dict]:
+        return [s for s in self.load_manifest(file_id) if s["model"] == model_name]
+
+    def models(self, file_id: str) -> List[str]:
+        """Embedding models with segments for a document, oldest first."""
+        return list(dict.fromkeys(s["model"] for s in self.load_manifest(file_id)))
+
+    def file_ids(self) -> List[str]:
+        if not self.root.exists():
+            return []
+        return [p.parent.name for p in self.root.glob("*/manifest.json")]
+
+    def covered_ranges(self, file_id: str, model_name: str) -> List[PageRange]:
+        return _merge_ranges([r for s in self.segments(file_id, model_name) for r in s["ranges"]])
+
+    def missing_runs(self, file_id: str, model_name: str, from_page: int, to_page: int) -> List[PageRange]:
+        """Contiguous runs of pages in the range that are not indexed yet."""
+        runs: List[PageRange] = []
+        cursor = from_page
+        for start, end in self.covered_ranges(file_id, model_name):
+            if end < cursor:
+                continue
+            if start > to_page:
+                break
+            if start > cursor:
+                runs.append((cursor, start - 1))
+            cursor = max(cursor, end + 1)
+        if cursor <= to_page:
+            runs.append((cursor, to_page))
+        return runs
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+    def add_segment(
+        self,
+        file_id: str,
+        model_name: str,
+        page_range: PageRange,
+        texts: Sequence[str],
+        embeddings: Sequence[np.ndarray],
+        pages: Sequence[int],
+        dtype: str = "float32",
+    ) -> Dict:
+        """Write a segment covering ``page_range`` and register it in the manifest."""
+        name = f"p{page_range[0]}-{page_range[1]}"
+        base = self._segment_base(file_id, model_name, name)
+        write_index(
+            base,
+            texts,
+            embeddings,
+            model_name=model_name,
+            id_prefix=f"{file_id}_{name}",
+            dtype=dtype,
+            pages=pages,
+        )
+        write_lexical_index(base, texts)
+        entry = {
+            "name": name,
+            "model": model_name,
+            "dim": int(np.asarray(embeddings[0]).shape[-1]) if len(embeddings) else 0,
+            "ranges": [list(page_range)],
+            "chunks": len(texts),
+        }
+        segments = [s for s in self.load_manifest(file_id) if not (s["model"] == model_name and s["name"] == name)]
+        segments.append(entry)
+        self._save_manifest(file_id, segments)
+        if len([s for s in segments if s["model"] == model_name]) > _MAX_SEGMENTS:
+            self.compact(file_id, model_name, dtype)
+        return entry
+
+    def compact(self, file_id: str, model_name: str, dtype: str = "float32") -> None:
+        """Merge all segments of a model into one, keeping rows in page order."""
+        own = self.segments(file_id, model_name)
+        texts: List[str] = []
+        vectors: List[np.ndarray] = []
+        pages: List[int] = []
+        tokens: List[int] = []
+        for seg in own:
+            index = load_index(self._segment_base(file_id, model_name, seg["name"]))
+            for row in range(len(index)):
+                texts.append(index.text(row))
+                vectors.append(np.asarray(index.matrix[row]))
+                pages.append(int(index.pages[row]))
+                tokens.append(int(index.tokens[row]))
+        order = sorted(range(len(pages)), key=pages.__getitem__)
+        ranges = _merge_ranges([r for seg in own for r in seg["ranges"]])
+        # Unique per compaction: a name derived from the span can equal one of the
+        # segments being merged, whose files are deleted below
+        name = f"merged-{ranges[0][0]}-{ranges[-1][1]}-{uuid.uuid4().hex[:8]}"
+        base = self._segment_base(file_id, model_name, name)
+        write_index(
+            base,
+            [texts[i] for i in order],
+            [vectors[i] for i in order],
+            model_name=model_name,
+            id_prefix=f"{file_id}_{name}",
+            dtype=dtype,
+            pages=[pages[i] for i in order],
+            token_counts=[tokens[i] for i in order],
+        )
+        write_lexical_index(base, [texts[i] for i in order])
+        others = [s for s in self.load_manifest(file_id) if s["model"] != model_name]
+        merged = {
+            "name": name,
+            "model": model_name,
+            "dim": int(vectors[0].shape[-1]) if vectors else 0,
+            "ranges": [list(r) for r in ranges],
+            "chunks": len(texts),
+        }
+        self._save_manifest(file_id, others + [merged])
+        for seg in own:
+            if seg["name"] == name:
+                continue
+            remove_index(self._segment_base(file_id, model_name, seg["name"]))
+            remove_lexical_index(self._segment_base(file_id, model_name, seg["name"]))
+
+    def remove_model(self, file_id: str, model_name: str) -> None:
+        """Delete every segment of one model, e.g. once a newer model covers its pages."""
+        own = self.segments(file_id, model_name)
+        self._save_manifest(file_id, [s for s in self.load_manifest(file_id) if s["model"] != model_name])
+        for seg in own:
+            remove_index(self._segment_base(file_id, model_name, seg["name"]))
+            remove_lexical_index(self._segment_base(file_id, model_name, seg["name"]))
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+    def open_range(
+        self, file_id: str, model_name: str, from_page: int, to_page: int
+    ) -> Optional[List[Tuple[VectorIndex, slice]]]:
+        """Segment views covering the whole range, or None if pages are missing."""
+        if self.missing_runs(file_id, model_name, from_page, to_page):
+            return None
+        parts: List[Tuple[VectorIndex, slice]] = []
+        for seg in self.segments(file_id, model_name):
+            runs = [(max(a, from_page), min(b, to_page)) for a, b in seg["ranges"] if a <= to_page and b >= from_page]
+            if not runs:
+                continue
+            base = self._segment_base(file_id, model_name, seg["name"])
+            if not index_exists(base):
+                return None
+            index = load_index(base)
+            # A merged segment can have gaps filled by other segments: one part per
+            # contiguous run, so no part spans pages of another segment
+            for start, end in runs:
+                rows = index.page_rows(start, end)
+                if rows.stop > rows.start:
+                    parts.append((index, rows))
+        # Parts never share pages, so ordering by first page keeps page order
+        parts.sort(key=lambda part: int(part[0].pages[part[1].start]))
+        return parts
+
+    def chunk_count(self, file_id: str, model_name: str, from_page: int, to_page: int) -> int:
+        parts = self.open_range(file_id, model_name, from_page, to_page) or []
+        return sum(rows.stop - rows.start for _, rows in parts)
+
+
+class ConcatDocuments(Sequence):
+    """Several ``LazyDocuments`` slices presented as one sequence."""
+
+    def __init__(self, parts: Sequence[LazyDocuments]):
+        self._parts = list(parts)
+        self._starts = np.cumsum([0] + [len(p) for p in self._parts])
+
+    def __len__(self) -> int:
+        return int(self._starts[-1])
+
+    def __getitem__(self, i):  # type: ignore[override]
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        part = int(np.searchsorted(self._starts, i, side="right")) - 1
+        return self._parts[part][i - int(self._starts[part])]
+
+
+__all__ = ["PageSegmentStore", "ConcatDocuments", "PageRange"]
@@ -0,0 +1,119 @@
+"""
+Pluggable PDF text extraction backends.
+
+* ``pdfplumber`` – layout-aware and slow; the historical default.
+* ``pymupdf``    – PyMuPDF (``fitz``), many times faster on plain text.
+
+``choose_extractor`` picks one per document: PyMuPDF is used unless its
+output on a sample of pages looks sparse or garbled (broken font encodings,
+mostly symbols), in which case pdfplumber is tried instead.
+"""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import Dict, List
+
+import fitz  # PyMuPDF
+import pdfplumber  # type: ignore
+
+
+class PdfExtractor(ABC):
+    """Extracts page texts from a PDF on disk; pages are 0-based, ``end`` exclusive."""
+
+    name = ""
+
+    @abstractmethod
+    def page_count(self, pdf_path: str) -> int:
+        ...
+
+    @abstractmethod
+    def extract_pages(self, pdf_path: str, start: int, end: int) -> List[str]:
+        ...
+
+
+class PdfPlumberExtractor(PdfExtractor):
+    name = "pdfplumber"
+
+    def page_count(self, pdf_path: str) -> int:
+        with pdfplumber.open(pdf_path) as pdf:
+            return len(pdf.pages)
+
+    def extract_pages(self, pdf_path: str, start: int, end: int) -> List[str]:
+        texts = []
+        with pdfplumber.open(pdf_path) as pdf:
+            for page in pdf.pages[start:end]:
+                texts.append(page.extract_text() or "")
+                # Release parsed layout objects, long books otherwise grow memory
+                page.flush_cache()
+        return texts
+
+
+class PyMuPDFExtractor(PdfExtractor):
+    name = "pymupdf"
+
+    def page_count(self, pdf_path: str) -> int:
+        with fitz.open(pdf_path) as doc:
+            return doc.page_count
+
+    def extract_pages(self, pdf_path: str, start: int, end: int) -> List[str]:
+        with fitz.open(pdf_path) as doc:
+            end = min(end, doc.page_count)
+            # sort=True restores reading order on multi-column pages
+            return [doc[i].get_text("text", sort=True) for i in range(start, end)]
+
+
+EXTRACTORS: Dict[str, PdfExtractor] = {
+    PdfPlumberExtractor.name: PdfPlumberExtractor(),
+    PyMuPDFExtractor.name: PyMuPDFExtractor(),
+}
+
+# Heuristic thresholds for trusting PyMuPDF output
+_SAMPLE_PAGES = 5
+_MIN_CHARS_PER_PAGE = 200
+_MIN_LETTER_RATIO = 0.6
+_MAX_REPLACEMENT_RATIO = 0.01
+
+
+def get_extractor(name: str) -> PdfExtractor:
+    try:
+        return EXTRACTORS[name]
+    except KeyError:
+        raise ValueError(f"Unknown PDF extractor '{name}', expected one of {sorted(EXTRACTORS)}")
+
+
+def _looks_clean(text: str) -> bool:
+    visible = [c for c in text if not c.isspace()]
+    if not visible:
+        return False
+    letters = sum(c.isalpha() for c in visible) / len(visible)
+    replacement = text.count("�") / len(visible)
+    return letters >= _MIN_LETTER_RATIO and replacement <= _MAX_REPLACEMENT_RATIO
+
+
+def choose_extractor(pdf_path: str) -> str:
+    """Pick a backend for this document from a sample of evenly spread pages."""
+    fast = EXTRACTORS[PyMuPDFExtractor.name]
+    total = fast.page_count(pdf_path)
+    if not total:
+        return PdfPlumberExtractor.name
+    pages = range(0, total, max(1, total // _SAMPLE_PAGES))[:_SAMPLE_PAGES]
+    text = "".join(fast.extract_pages(pdf_path, i, i + 1)[0] for i in pages)
+    if len(text.strip()) / len(pages) >= _MIN_CHARS_PER_PAGE and _looks_clean(text):
+        return PyMuPDFExtractor.name
+    # Sparse text may still be a short or mostly-figures document; only switch
+    # to pdfplumber when it actually recovers more readable text
+    slow = EXTRACTORS[PdfPlumberExtractor.name]
+    slow_text = "".join(slow.extract_pages(pdf_path, i, i + 1)[0] for i in pages)
+    if _looks_clean(slow_text) and (not _looks_clean(text) or len(slow_text) > len(text)):
+        return PdfPlumberExtractor.name
+    return PyMuPDFExtractor.name
+
+
+__all__ = [
+    "EXTRACTORS",
+    "PdfExtractor",
+    "PdfPlumberExtractor",
+    "PyMuPDFExtractor",
+    "choose_extractor",
+    "get_extractor",
+]
@@ -11,6 +11,8 @@ from typing import List
 
 import pdfplumber  # type: ignore
 
+from assistance.pdf_extractors import get_extractor
+
 
 def extract_text_from_pdf(pdf_bytes: bytes, from_page: int | None = None, to_page: int | None = None) -> str:
     """Extract text from *all* pages of a PDF using pdfplumber.
@@ -71,6 +73,28 @@ def get_pdf_page_count(pdf_bytes: bytes) -> int:
     except Exception as exc:
         raise ValueError(f"Error reading PDF for page count: {exc}") from exc
 
+def get_pdf_page_count_from_path(pdf_path: str) -> int:
+    """
+    Returns the number of pages of a PDF on disk without reading it into memory.
+    """
+    try:
+        return get_extractor("pymupdf").page_count(pdf_path)
+    except Exception as exc:
+        raise ValueError(f"Error reading PDF for page count: {exc}") from exc
+
+def extract_pages_from_path(pdf_path: str, start: int, end: int, backend: str = "pdfplumber") -> List[str]:
+    """
+    Extracts the text of pages ``start..end-1`` (0-based) of a PDF on disk.
+
+    Opens the file itself so it can run in a worker process and only the
+    requested pages are parsed. ``backend`` names an entry of
+    ``pdf_extractors.EXTRACTORS``.
+    """
+    try:
+        return get_extractor(backend).extract_pages(pdf_path, start, end)
+    except Exception as exc:
+        raise ValueError(f"Error extracting text from PDF: {exc}") from exc
+
 def extract_text_from_txt(txt_file: bytes) -> str:
     """
     Extract text from a plain text file.
@@ -0,0 +1,177 @@
+"""
+Background migration of document indexes to the configured embedding model.
+
+After ``Settings.embedding_model`` changes, every document keeps answering
+from the segments of its previous model (see
+``DocumentProcessor.get_embeddings_service``) while this scheduler re-embeds
+the pages those segments cover. It migrates one document at a time, most
+queried first, as ``reembed`` indexing jobs capped at
+``reembedding_chunks_per_minute``. Whole-range indexes from before page
+segments are migrated the same way. Once a document is fully covered by the
+new model, its old segments and legacy indexes are deleted.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlmodel import select
+
+from assistance.concurrency import RateLimiter
+from assistance.page_segments import _merge_ranges
+from core.config import get_settings
+from core.db import Document as DocumentDB, IndexingJob, get_async_session
+
+
+class ReembeddingScheduler:
+    """Periodically finds documents indexed with an old model and migrates them."""
+
+    def __init__(self, processor, chunks_per_minute: int, interval_seconds: float):
+        self.processor = processor
+        self.throttle = RateLimiter(chunks_per_minute)
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+        self.current: Optional[str] = None
+        self.pending = 0
+        self.migrated = 0
+        self.failed = 0
+
+    @property
+    def model_name(self) -> str:
+        return self.processor.embeddings_service.model_name
+
+    def _legacy_ranges(self, file_id: Optional[str] = None) -> List[Tuple[str, int, int]]:
+        """Whole-range indexes from before page segments that were built with another model."""
+        return [
+            (f, a, b)
+            for f, a, b, model in self.processor.legacy_indexes()
+            if model != self.model_name and (file_id is None or f == file_id)
+        ]
+
+    def _outdated_ranges(self, file_id: str) -> List[Tuple[int, int]]:
+        """Pages indexed with other models that the current model does not cover yet."""
+        segments = self.processor.segments
+        old = _merge_ranges(
+            [r for m in segments.models(file_id) if m != self.model_name for r in segments.covered_ranges(file_id, m)]
+            + [(a, b) for _, a, b in self._legacy_ranges(file_id)]
+        )
+        return [run for a, b in old for run in segments.missing_runs(file_id, self.model_name, a, b)]
+
+    def _priority(self, file_id: str) -> Tuple[int, float]:
+        # Hot documents first: most queries, then most recent query
+        count, last = self.processor.access_stats.get(file_id) or (0, 0.0)
+        return -count, -last
+
+    def pending_documents(self) -> List[str]:
+        segments = self.processor.segments
+        outdated = {
+            f for f in segments.file_ids() if any(m != self.model_name for m in segments.models(f))
+        }
+        outdated.update(f for f, _, _ in self._legacy_ranges())
+        return sorted(outdated, key=self._priority)
+
+    async def run_once(self) -> None:
+        """Migrate every outdated document once, hottest first."""
+        # Manifest globs and reads are disk work, kept off the event loop like the rest below
+        queue = await asyncio.to_thread(self.pending_documents)
+        self.pending = len(queue)
+        for file_id in queue:
+            self.current = file_id
+            try:
+                await self._migrate(file_id)
+                self.migrated += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"Re-embedding of {file_id} failed: {e}")
+            finally:
+                self.current = None
+                self.pending -= 1
+
+    async def _migrate(self, file_id: str) -> None:
+        async with get_async_session() as session:
+            db_doc = await session.get(DocumentDB, file_id)
+            if db_doc is None:
+                return
+            user_id = db_doc.user_id
+            # Reuse jobs left over from an interrupted run so their progress counts
+            result = await session.execute(
+                select(IndexingJob).where(
+                    IndexingJob.file_id == file_id,
+                    IndexingJob.kind == "reembed",
+                    IndexingJob.status.in_(["queued", "running"]),
+                )
+            )
+            jobs = {(j.from_page, j.to_page): j for j in result.scalars().all()}
+            outdated = await asyncio.to_thread(self._outdated_ranges, file_id)
+            for from_page, to_page in outdated:
+                if (from_page, to_page) not in jobs:
+                    job = IndexingJob(file_id=file_id, from_page=from_page, to_page=to_page, kind="reembed")
+                    session.add(job)
+                    jobs[(from_page, to_page)] = job
+            await session.commit()
+            job_ids = [j.id for j in jobs.values()]
+
+        for job_id in job_ids:
+            # Sequential and throttled, so migration never competes hard with user uploads
+            await self.processor._run_indexing_job(job_id, throttle=self.throttle)
+
+        if not await asyncio.to_thread(self._outdated_ranges, file_id):
+            await asyncio.to_thread(self._remove_old_indexes, user_id, file_id)
+            self.processor.index_cache.invalidate(file_id)
+            print(f"Re-embedded {file_id} with {self.model_name}")
+
+    def _remove_old_indexes(self, user_id: str, file_id: str) -> None:
+        """Delete the segments (and library rows) of other models and the legacy indexes of a migrated document."""
+        for model in self.processor.segments.models(file_id):
+            if model != self.model_name:
+                self.processor.remove_model_index(user_id, file_id, model)
+        for _, from_page, to_page in self._legacy_ranges(file_id):
+            self.processor.remove_legacy_index(file_id, from_page, to_page)
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"Re-embedding scheduler error: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "running": self._task is not None,
+            "current": self.current,
+            "pending": self.pending,
+            "migrated": self.migrated,
+            "failed": self.failed,
+            "chunks_per_minute": self.throttle.per_minute,
+        }
+
+
+def _create_scheduler() -> ReembeddingScheduler:
+    from assistance.document_processor import document_processor_singleton
+
+    settings = get_settings()
+    return ReembeddingScheduler(
+        document_processor_singleton,
+        chunks_per_minute=settings.reembedding_chunks_per_minute,
+        interval_seconds=settings.reembedding_interval_seconds,
+    )
+
+
+reembedding_scheduler = _create_scheduler()
+
+__all__ = ["ReembeddingScheduler", "reembedding_scheduler"]
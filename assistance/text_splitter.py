@@ -1,35 +1,158 @@
 """
 Text splitting utilities for chunking documents.
+
+Two chunkers, both streaming generators without third-party dependencies:
+
+* ``iter_compat_chunks`` – character-sized chunks with exactly the boundaries
+  langchain's ``RecursiveCharacterTextSplitter`` produced for our separators,
+  so existing indexes and the shared chunk store keep matching.
+* ``iter_token_chunks``  – chunks measured in tokens of the context encoder,
+  built from whole sentences where possible, with token overlap.
 """
-from typing import List
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import re
+from typing import Iterator, List, Tuple
+
+from assistance.token_counter import get_encoder
+
+# Order matters: the first separator present in a piece of text is used for it
+_SEPARATORS = ["\n\n", "\n", ".", "!", "?", ";", ":", " ", ""]
+
+# A sentence ends after terminal punctuation (plus closing quotes/brackets) or a blank line
+_SENTENCE_RE = re.compile(r"\S.*?(?:[.!?…]+[\"'»”)\]]*(?=\s)|\n\s*\n|$)", re.DOTALL)
+_WORD_RE = re.compile(r"\S+")
+
+
+# ---------------------------------------------------------------------------
+# Compatibility mode (character lengths)
+# ---------------------------------------------------------------------------
+def _split_keeping_separator(text: str, separator: str) -> List[str]:
+    """Split on ``separator``, which stays attached to the start of the following piece."""
+    if not separator:
+        return list(text)
+    pieces = text.split(separator)
+    splits = [pieces[0]] + [separator + p for p in pieces[1:]]
+    return [s for s in splits if s != ""]
+
+
+def _merge_splits(splits: List[str], chunk_size: int, chunk_overlap: int) -> Iterator[str]:
+    current: List[str] = []
+    total = 0
+    for piece in splits:
+        length = len(piece)
+        if total + length > chunk_size and current:
+            chunk = "".join(current).strip()
+            if chunk:
+                yield chunk
+            # Drop pieces from the front until only the overlap is left and the next piece fits
+            while total > chunk_overlap or (total + length > chunk_size and total > 0):
+                total -= len(current[0])
+                current = current[1:]
+        current.append(piece)
+        total += length
+    chunk = "".join(current).strip()
+    if chunk:
+        yield chunk
+
+
+def _recursive_chunks(text: str, separators: List[str], chunk_size: int, chunk_overlap: int) -> Iterator[str]:
+    separator, remaining = separators[-1], []
+    for i, candidate in enumerate(separators):
+        if candidate == "":
+            separator = candidate
+            break
+        if candidate in text:
+            separator, remaining = candidate, separators[i + 1 :]
+            break
+
+    good: List[str] = []
+    for piece in _split_keeping_separator(text, separator):
+        if len(piece) < chunk_size:
+            good.append(piece)
+            continue
+        if good:
+            yield from _merge_splits(good, chunk_size, chunk_overlap)
+            good = []
+        if remaining:
+            yield from _recursive_chunks(piece, remaining, chunk_size, chunk_overlap)
+        else:
+            yield piece
+    if good:
+        yield from _merge_splits(good, chunk_size, chunk_overlap)
+
+
+def iter_compat_chunks(text: str, chunk_size: int = 500, chunk_overlap: int = 50) -> Iterator[str]:
+    """Character-based chunks identical to the former langchain splitter."""
+    for chunk in _recursive_chunks(text, _SEPARATORS, chunk_size, chunk_overlap):
+        chunk = chunk.strip()
+        if chunk:
+            yield chunk
+
+
+# ---------------------------------------------------------------------------
+# Token mode
+# ---------------------------------------------------------------------------
+def _units(text: str, max_tokens: int, encoder) -> Iterator[Tuple[int, int, int]]:
+    """(start, end, tokens) spans of sentences; over-long sentences are cut at words."""
+    for sentence in _SENTENCE_RE.finditer(text):
+        tokens = len(encoder.encode_ordinary(sentence.group()))
+        if tokens <= max_tokens:
+            yield sentence.start(), sentence.end(), tokens
+            continue
+        for word in _WORD_RE.finditer(text, sentence.start(), sentence.end()):
+            word_text = word.group()
+            word_tokens = encoder.encode_ordinary(" " + word_text)
+            if len(word_tokens) <= max_tokens:
+                yield word.start(), word.end(), len(word_tokens)
+                continue
+            # A single "word" longer than a chunk (URLs, tables without spaces)
+            step = max(1, len(word_text) * max_tokens // len(word_tokens))
+            for offset in range(0, len(word_text), step):
+                piece = word_text[offset : offset + step]
+                yield word.start() + offset, word.start() + offset + len(piece), len(encoder.encode_ordinary(piece))
+
+
+def iter_token_chunks(text: str, max_tokens: int = 256, overlap_tokens: int = 32) -> Iterator[str]:
+    """
+    Token-sized chunks made of whole sentences, ``overlap_tokens`` shared with the previous one.
+
+    Sizes are sums of per-sentence token counts, which matches the token count
+    of the joined chunk up to a token or two at sentence joins.
+    """
+    encoder = get_encoder()
+    window: List[Tuple[int, int, int]] = []
+    total = 0
+    for unit in _units(text, max_tokens, encoder):
+        if window and total + unit[2] > max_tokens:
+            yield text[window[0][0] : window[-1][1]].strip()
+            # Keep trailing sentences within the overlap budget as the start of the next chunk
+            while window and (total > overlap_tokens or total + unit[2] > max_tokens):
+                total -= window.pop(0)[2]
+        window.append(unit)
+        total += unit[2]
+    if window:
+        yield text[window[0][0] : window[-1][1]].strip()
+
 
 def split_text_into_chunks(
-    text: str, 
-    chunk_size: int = 500, 
-    chunk_overlap: int = 50
+    text: str,
+    chunk_size: int = 500,
+    chunk_overlap: int = 50,
+    mode: str = "compat",
 ) -> List[str]:
     """
     Split text into smaller chunks for processing.
-    
+
     Args:
         text: The text to split
-        chunk_size: Maximum size of each chunk
-        chunk_overlap: Number of characters to overlap between chunks
-        
+        chunk_size: Maximum size of each chunk (characters, or tokens in "tokens" mode)
+        chunk_overlap: Overlap between consecutive chunks, in the same unit
+        mode: "compat" (character boundaries as before) or "tokens"
+
     Returns:
         List of text chunks
     """
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        length_function=len,
-        separators=["\n\n", "\n", ".", "!", "?", ";", ":", " ", ""]
-    )
-    
-    chunks = text_splitter.split_text(text)
-    
-    # Filter out empty chunks
-    chunks = [chunk.strip() for chunk in chunks if chunk.strip()]
-    
-    return chunks 
\ No newline at end of file
+    if mode == "tokens":
+        return list(iter_token_chunks(text, chunk_size, chunk_overlap))
+    if mode != "compat":
+        raise ValueError(f"Unknown chunking mode: {mode}")
+    return list(iter_compat_chunks(text, chunk_size, chunk_overlap))
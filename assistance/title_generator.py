@@ -1,16 +1,7 @@
-import os
-from dotenv import load_dotenv
-from openai import OpenAI
 from typing import List, Dict, Any
 
-load_dotenv()
+from assistance.openai_client import get_openai_client
 
-# --- OpenAI Client ---
-openai_api_key = os.getenv("OPENAI_API_KEY")
-if not openai_api_key:
-    raise ValueError("OPENAI_API_KEY not found in environment variables")
-
-client = OpenAI(api_key=openai_api_key)
 
 async def generate_chat_title_from_ai(user_first_message: str) -> str:
     """
@@ -29,7 +20,7 @@ async def generate_chat_title_from_ai(user_first_message: str) -> str:
     messages_for_ai: List[Dict[str, Any]] = [system_prompt, user_prompt]
 
     try:
-        response = client.chat.completions.create(
+        response = await get_openai_client().chat.completions.create(
             model="gpt-3.5-turbo",  # Using a faster model for this simple task
             messages=messages_for_ai,
             temperature=0.2,
@@ -0,0 +1,42 @@
+"""
+Process-wide tokenizer used to budget LLM context.
+
+Chunk token counts are computed once when an index is written and stored next
+to it, so answering a question never tokenizes text.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Sequence
+
+import numpy as np
+import tiktoken
+
+CONTEXT_ENCODING = "cl100k_base"
+
+
+@lru_cache(maxsize=None)
+def get_encoder() -> tiktoken.Encoding:
+    return tiktoken.get_encoding(CONTEXT_ENCODING)
+
+
+def count_tokens(text: str) -> int:
+    return len(get_encoder().encode_ordinary(text))
+
+
+def count_tokens_many(texts: Sequence[str]) -> np.ndarray:
+    """Token count of every text as int32, tokenized in parallel threads."""
+    if not len(texts):
+        return np.zeros(0, dtype=np.int32)
+    return np.fromiter(
+        (len(t) for t in get_encoder().encode_ordinary_batch(list(texts))), dtype=np.int32, count=len(texts)
+    )
+
+
+def fit_to_budget(token_counts: Sequence[int], max_tokens: int) -> int:
+    """Length of the longest prefix whose token counts sum to at most ``max_tokens``."""
+    cumulative = np.cumsum(np.asarray(token_counts, dtype=np.int64))
+    return int(np.searchsorted(cumulative, max_tokens, side="right"))
+
+
+__all__ = ["CONTEXT_ENCODING", "count_tokens", "count_tokens_many", "fit_to_budget", "get_encoder"]
@@ -0,0 +1,264 @@
+"""
+On-disk format for document embedding indexes.
+
+An index with base path ``cache/embeddings/<name>`` is stored as:
+
+* ``<name>.vectors.npy`` – contiguous (N, dim) float32 matrix, rows L2-normalized
+* ``<name>.search.npy``  – optional float16/int8 copy scanned on every query
+* ``<name>.scales.npy``  – per-row float32 scales of an int8 search copy
+* ``<name>.pages.npy``   – optional int32 source page of every row, ascending
+* ``<name>.tokens.npy``  – int32 context-token count of every chunk
+* ``<name>.offsets.npy`` – int64 array of N+1 byte offsets into the text sidecar
+* ``<name>.texts.bin``   – UTF-8 chunk texts concatenated back to back
+* ``<name>.meta.json``   – model, dimension, dtype and chunk count
+
+Arrays are opened with ``mmap_mode="r"``, so loading does not depend on the
+number of chunks and all worker processes share the same OS page cache.
+With a compact search copy only that copy stays hot; the float32 matrix is
+read just for the handful of candidates that get rescored.
+The meta file is written last and marks the index as complete.
+"""
+from __future__ import annotations
+
+import json
+import mmap
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from assistance.embeddings import Document, normalize_rows, quantize_int8
+from assistance.token_counter import count_tokens_many
+
+INDEX_FORMAT_VERSION = 2
+SEARCH_DTYPES = ("float32", "float16", "int8")
+
+
+def model_slug(model_name: str) -> str:
+    """Filesystem-safe form of an embedding model name."""
+    return model_name.replace("/", "_").replace(":", "_")
+
+
+def _paths(base: Path) -> Dict[str, Path]:
+    return {
+        "vectors": base.with_name(base.name + ".vectors.npy"),
+        "search": base.with_name(base.name + ".search.npy"),
+        "scales": base.with_name(base.name + ".scales.npy"),
+        "pages": base.with_name(base.name + ".pages.npy"),
+        "tokens": base.with_name(base.name + ".tokens.npy"),
+        "offsets": base.with_name(base.name + ".offsets.npy"),
+        "texts": base.with_name(base.name + ".texts.bin"),
+        "meta": base.with_name(base.name + ".meta.json"),
+    }
+
+
+def index_exists(base: Path) -> bool:
+    """Return True when a complete index is stored at ``base``."""
+    return _paths(base)["meta"].exists()
+
+
+def write_index(
+    base: Path,
+    texts: Sequence[str],
+    embeddings: Sequence[np.ndarray],
+    model_name: str,
+    id_prefix: str,
+    dtype: str = "float32",
+    pages: Optional[Sequence[int]] = None,
+    token_counts: Optional[Sequence[int]] = None,
+) -> None:
+    """Write chunk texts and their embeddings in the memory-mappable format.
+
+    Rows are normalized once here so queries are a plain dot product.
+    ``dtype`` selects the storage of the search copy: ``float32`` (none),
+    ``float16`` or ``int8``. ``pages`` records the source page of each chunk
+    and must be ascending so a page range maps to a contiguous row slice.
+    ``token_counts`` are computed from ``texts`` when not given.
+    """
+    if dtype not in SEARCH_DTYPES:
+        raise ValueError(f"Unsupported index dtype: {dtype}")
+    paths = _paths(base)
+    base.parent.mkdir(parents=True, exist_ok=True)
+
+    if len(embeddings):
+        matrix = np.ascontiguousarray(normalize_rows(np.vstack(embeddings)))
+    else:
+        matrix = np.zeros((0, 0), dtype=np.float32)
+    search = scales = None
+    if dtype == "float16":
+        search = matrix.astype(np.float16)
+    elif dtype == "int8":
+        search, scales = quantize_int8(matrix)
+    encoded = [t.encode("utf-8") for t in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+
+    # Write to temporary names first so readers never see a half-written index
+    tmp = {k: p.with_name(p.name + ".tmp") for k, p in paths.items()}
+    with open(tmp["vectors"], "wb") as f:
+        np.save(f, matrix)
+    if search is not None:
+        with open(tmp["search"], "wb") as f:
+            np.save(f, search)
+    if scales is not None:
+        with open(tmp["scales"], "wb") as f:
+            np.save(f, scales)
+    if pages is not None:
+        with open(tmp["pages"], "wb") as f:
+            np.save(f, np.asarray(pages, dtype=np.int32))
+    if token_counts is None:
+        token_counts = count_tokens_many(texts)
+    with open(tmp["tokens"], "wb") as f:
+        np.save(f, np.asarray(token_counts, dtype=np.int32))
+    with open(tmp["offsets"], "wb") as f:
+        np.save(f, offsets)
+    with open(tmp["texts"], "wb") as f:
+        f.write(b"".join(encoded))
+    meta = {
+        "version": INDEX_FORMAT_VERSION,
+        "model": model_name,
+        "dim": int(matrix.shape[1]),
+        "count": int(matrix.shape[0]),
+        "dtype": str(matrix.dtype),
+        "search_dtype": dtype,
+        "normalized": True,
+        "id_prefix": id_prefix,
+    }
+    with open(tmp["meta"], "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    for key in ("vectors", "search", "scales", "pages", "tokens", "offsets", "texts", "meta"):
+        if tmp[key].exists():
+            os.replace(tmp[key], paths[key])
+        elif key in ("search", "scales", "pages"):
+            # Drop a stale compact copy from a previous build with another dtype
+            paths[key].unlink(missing_ok=True)
+
+
+def remove_index(base: Path) -> None:
+    """Delete all files of an index if present."""
+    for path in _paths(base).values():
+        path.unlink(missing_ok=True)
+
+
+class VectorIndex:
+    """Read-only, memory-mapped view of an index written by ``write_index``."""
+
+    def __init__(self, base: Path):
+        self.base = Path(base)
+        paths = _paths(base)
+        with open(paths["meta"], "r", encoding="utf-8") as f:
+            self.meta: Dict[str, Any] = json.load(f)
+        self.matrix: np.ndarray = np.load(paths["vectors"], mmap_mode="r")
+        self.search_matrix: np.ndarray | None = None
+        self.search_scales: np.ndarray | None = None
+        if self.meta.get("search_dtype", "float32") != "float32":
+            self.search_matrix = np.load(paths["search"], mmap_mode="r")
+            if self.meta["search_dtype"] == "int8":
+                self.search_scales = np.load(paths["scales"], mmap_mode="r")
+        self.pages: np.ndarray | None = (
+            np.load(paths["pages"], mmap_mode="r") if paths["pages"].exists() else None
+        )
+        self.tokens: np.ndarray | None = (
+            np.load(paths["tokens"], mmap_mode="r") if paths["tokens"].exists() else None
+        )
+        self.offsets: np.ndarray = np.load(paths["offsets"], mmap_mode="r")
+        with open(paths["texts"], "rb") as f:
+            # mmap of an empty file is not allowed
+            self._texts = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+
+    def __len__(self) -> int:
+        return int(self.meta["count"])
+
+    @property
+    def model_name(self) -> str:
+        return self.meta["model"]
+
+    @property
+    def normalized(self) -> bool:
+        # Version 1 indexes stored raw embeddings
+        return bool(self.meta.get("normalized", False))
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate resident size of the parts touched on every query."""
+        hot = self.search_matrix if self.search_matrix is not None else self.matrix
+        total = hot.nbytes + self.offsets.nbytes + len(self._texts)
+        if self.search_scales is not None:
+            total += self.search_scales.nbytes
+        return int(total)
+
+    def page_rows(self, from_page: int, to_page: int) -> slice:
+        """Row slice holding the chunks of pages ``from_page..to_page``."""
+        if self.pages is None:
+            return slice(0, len(self))
+        start = int(np.searchsorted(self.pages, from_page, side="left"))
+        stop = int(np.searchsorted(self.pages, to_page, side="right"))
+        return slice(start, stop)
+
+    def text(self, i: int) -> str:
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return bytes(self._texts[start:end]).decode("utf-8")
+
+
+class LazyDocuments(Sequence[Document]):
+    """Sequence of ``Document`` objects materialized on access from an index.
+
+    ``rows`` restricts the sequence to a contiguous slice of the index.
+    """
+
+    def __init__(self, index: VectorIndex, rows: slice | None = None):
+        self._index = index
+        self._start, self._stop, _ = (rows or slice(0, len(index))).indices(len(index))
+
+    def __len__(self) -> int:
+        return max(0, self._stop - self._start)
+
+    def __getitem__(self, i):  # type: ignore[override]
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        row = self._start + i
+        return Document(
+            id=f"{self._index.meta['id_prefix']}_{row}",
+            text=self._index.text(row),
+            embedding=self._index.matrix[row],
+            token_count=int(self._index.tokens[row]) if self._index.tokens is not None else None,
+        )
+
+    def __iter__(self) -> Iterator[Document]:
+        for i in range(len(self)):
+            yield self[i]
+
+
+def _backfill_tokens(base: Path) -> None:
+    """Add the token-count sidecar to an index written before it existed."""
+    index = VectorIndex(base)
+    path = _paths(base)["tokens"]
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, count_tokens_many([index.text(i) for i in range(len(index))]))
+    os.replace(tmp, path)
+
+
+def load_index(base: Path) -> VectorIndex:
+    """Open the index stored at ``base``."""
+    if not _paths(base)["tokens"].exists():
+        _backfill_tokens(base)
+    return VectorIndex(base)
+
+
+def documents_to_index(base: Path, documents: List[Document], model_name: str, id_prefix: str, dtype: str = "float32") -> None:
+    """Convert a list of in-memory ``Document`` objects to the on-disk format."""
+    write_index(
+        base,
+        [d.text for d in documents],
+        [d.embedding for d in documents],
+        model_name,
+        id_prefix,
+        dtype,
+    )
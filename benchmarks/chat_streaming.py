@@ -0,0 +1,173 @@
+"""
+Load test of concurrent chat streams in one event loop.
+
+A fake OpenAI-compatible server (separate process, no API key or network
+needed) streams ``--tokens`` chunks per completion, ``--delay`` seconds
+apart. Two client strategies are run against it at growing concurrency:
+
+* ``sync``  – the former pattern: a synchronous ``OpenAI`` stream iterated
+  inside an async generator, so every wait for a token blocks the loop.
+* ``async`` – the shared pooled ``AsyncOpenAI`` client from
+  ``assistance/openai_client.py`` used by the chat pipeline now.
+
+Reported: wall time for all streams, time to first token p50/p95 and the
+worst event-loop stall (how late a 10 ms timer fired), which is what every
+other request on the worker experiences.
+
+Usage:
+    python benchmarks/chat_streaming.py
+    python benchmarks/chat_streaming.py --concurrency 1 50 200 500 --tokens 100 --delay 0.02
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import AsyncIterator, List, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def _serve(port: int, tokens: int, delay: float) -> None:
+    """Fake ``/v1/chat/completions`` streaming endpoint."""
+    import uvicorn
+    from starlette.applications import Starlette
+    from starlette.responses import StreamingResponse
+    from starlette.routing import Route
+
+    async def completions(request):
+        async def events():
+            for i in range(tokens):
+                await asyncio.sleep(delay)
+                chunk = {
+                    "id": "bench",
+                    "object": "chat.completion.chunk",
+                    "created": 0,
+                    "model": "bench",
+                    "choices": [{"index": 0, "delta": {"content": f"t{i} "}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    app = Starlette(routes=[Route("/v1/chat/completions", completions, methods=["POST"])])
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", backlog=4096)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_port(port: int, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    sys.exit("fake server did not start")
+
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+async def _sync_stream(client) -> AsyncIterator[str]:
+    stream = client.chat.completions.create(model="bench", messages=MESSAGES, stream=True)
+    for chunk in stream:
+        if chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+async def _async_stream(client) -> AsyncIterator[str]:
+    stream = await client.chat.completions.create(model="bench", messages=MESSAGES, stream=True)
+    async for chunk in stream:
+        if chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+async def _run(mode: str, client, streams: int) -> Tuple[float, List[float], float]:
+    stall = 0.0
+    done = False
+
+    async def watchdog():
+        nonlocal stall
+        while not done:
+            t0 = time.perf_counter()
+            await asyncio.sleep(0.01)
+            stall = max(stall, time.perf_counter() - t0 - 0.01)
+
+    async def one() -> float:
+        t0 = time.perf_counter()
+        first = None
+        source = _sync_stream(client) if mode == "sync" else _async_stream(client)
+        async for _ in source:
+            if first is None:
+                first = time.perf_counter() - t0
+        return first if first is not None else float("nan")
+
+    ticker = asyncio.create_task(watchdog())
+    started = time.perf_counter()
+    ttft = await asyncio.gather(*(one() for _ in range(streams)))
+    elapsed = time.perf_counter() - started
+    done = True
+    await ticker
+    return elapsed, ttft, stall
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=0.02, help="seconds between streamed chunks")
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"], choices=["sync", "async"])
+    args = parser.parse_args()
+
+    port = _free_port()
+    server = mp.Process(target=_serve, args=(port, args.tokens, args.delay), daemon=True)
+    server.start()
+    _wait_for_port(port)
+
+    base_url = f"http://127.0.0.1:{port}/v1"
+    os.environ["OPENAI_API_KEY"] = "bench"
+    os.environ["OPENAI_BASE_URL"] = base_url
+    from openai import OpenAI
+
+    from assistance.openai_client import close_openai_client, get_openai_client
+
+    ideal = args.tokens * args.delay
+    print(f"{args.tokens} chunks x {args.delay * 1000:.0f} ms per stream (ideal {ideal:.2f}s)\n")
+    print(f"{'mode':<7}{'streams':>8}{'wall s':>9}{'ttft p50':>10}{'ttft p95':>10}{'max stall ms':>14}")
+    for mode in args.modes:
+        for streams in args.concurrency:
+
+            async def bench():
+                client = OpenAI(api_key="bench", base_url=base_url) if mode == "sync" else get_openai_client()
+                try:
+                    return await _run(mode, client, streams)
+                finally:
+                    if mode == "async":
+                        await close_openai_client()
+                    else:
+                        client.close()
+
+            elapsed, ttft, stall = asyncio.run(bench())
+            p50, p95 = np.nanpercentile(ttft, [50, 95])
+            print(f"{mode:<7}{streams:>8}{elapsed:>9.2f}{p50:>10.3f}{p95:>10.3f}{stall * 1000:>14.0f}")
+
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark of the PDF extraction backends in ``assistance/pdf_extractors.py``.
+
+For every backend the whole corpus is extracted in a fresh process, which
+reports pages/second and its peak RSS. Text quality is compared with
+pdfplumber (the previous default) as token-set F1 per document, so a fast
+backend that loses or garbles text is easy to spot.
+
+Usage:
+    python benchmarks/pdf_extraction.py path/to/pdfs [more.pdf ...]
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing as mp
+import resource
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from assistance.lexical_index import tokenize  # noqa: E402
+from assistance.pdf_extractors import EXTRACTORS, choose_extractor  # noqa: E402
+
+
+def _collect(paths: List[str]) -> List[str]:
+    pdfs: List[str] = []
+    for path in map(Path, paths):
+        pdfs.extend(str(p) for p in sorted(path.rglob("*.pdf"))) if path.is_dir() else pdfs.append(str(path))
+    return pdfs
+
+
+def _run_backend(name: str, pdfs: List[str], out) -> None:
+    """Runs in a child process so peak RSS belongs to this backend alone."""
+    extractor = EXTRACTORS[name]
+    texts: Dict[str, str] = {}
+    pages = 0
+    started = time.perf_counter()
+    for pdf in pdfs:
+        count = extractor.page_count(pdf)
+        texts[pdf] = "\n".join(extractor.extract_pages(pdf, 0, count))
+        pages += count
+    elapsed = time.perf_counter() - started
+    # ru_maxrss is in KiB on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    out.send({"pages": pages, "seconds": elapsed, "peak_rss_mb": peak_mb, "texts": texts})
+    out.close()
+
+
+def _token_f1(text: str, reference: str) -> float:
+    got, ref = Counter(tokenize(text)), Counter(tokenize(reference))
+    if not got and not ref:
+        return 1.0
+    overlap = sum((got & ref).values())
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / sum(got.values()), overlap / sum(ref.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="PDF files or directories searched recursively")
+    parser.add_argument("--backends", nargs="+", default=sorted(EXTRACTORS), choices=sorted(EXTRACTORS))
+    args = parser.parse_args()
+
+    pdfs = _collect(args.paths)
+    if not pdfs:
+        sys.exit("No PDF files found")
+
+    ctx = mp.get_context("spawn")
+    results = {}
+    for name in args.backends:
+        receiver, sender = ctx.Pipe(duplex=False)
+        proc = ctx.Process(target=_run_backend, args=(name, pdfs, sender))
+        proc.start()
+        results[name] = receiver.recv()
+        proc.join()
+
+    reference = results.get("pdfplumber")
+    print(f"{len(pdfs)} documents\n")
+    print(f"{'backend':<12}{'pages':>8}{'pages/s':>10}{'peak RSS MB':>14}{'chars':>12}{'F1 vs pdfplumber':>18}")
+    for name, res in results.items():
+        chars = sum(len(t) for t in res["texts"].values())
+        f1 = "-"
+        if reference is not None:
+            scores = [_token_f1(res["texts"][p], reference["texts"][p]) for p in pdfs]
+            f1 = f"{sum(scores) / len(scores):.3f} (min {min(scores):.3f})"
+        rate = res["pages"] / res["seconds"] if res["seconds"] else float("inf")
+        print(f"{name:<12}{res['pages']:>8}{rate:>10.1f}{res['peak_rss_mb']:>14.1f}{chars:>12}{f1:>18}")
+
+    print("\nauto choice per document:")
+    for backend, count in Counter(choose_extractor(p) for p in pdfs).items():
+        print(f"  {backend}: {count} documents")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Offline retrieval load test with the local embedding model.
+
+Chunks a text (a synthetic textbook by default), embeds it with the
+deterministic ``local/hashed-ngram`` provider, builds the dense and BM25
+indexes and then fires questions from several threads at once, the way
+concurrent chats hit a document. No network access or API key is needed, so
+it runs in CI and on isolated machines.
+
+Reported per concurrency level: queries per second and p50/p95/p99 latency
+of question embedding plus hybrid search.
+
+Usage:
+    python benchmarks/retrieval_load.py
+    python benchmarks/retrieval_load.py --text book.txt --queries 2000 --concurrency 1 8 32
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from assistance.embeddings import Document, EmbeddingsService  # noqa: E402
+from assistance.lexical_index import open_lexical_view, write_lexical_index  # noqa: E402
+from assistance.text_splitter import split_text_into_chunks  # noqa: E402
+
+
+def _synthetic_text(pages: int, rng: random.Random) -> str:
+    vocab = [f"term{i}" for i in range(5000)]
+    sentences = []
+    for _ in range(pages * 30):
+        words = rng.choices(vocab, k=rng.randint(8, 20))
+        sentences.append(" ".join(words).capitalize() + ".")
+    return " ".join(sentences)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--text", help="plain text file to index (default: synthetic, 300 pages)")
+    parser.add_argument("--model", default="local/hashed-ngram-768")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    text = Path(args.text).read_text(encoding="utf-8") if args.text else _synthetic_text(300, rng)
+    service = EmbeddingsService(args.model)
+    if not args.model.startswith("local/"):
+        print(f"warning: {args.model} is a remote model, this measures the API as well")
+
+    started = time.perf_counter()
+    chunks = split_text_into_chunks(text, 1000, 50)
+    embeddings = service.create_embeddings(chunks)
+    service.build_index([Document(id=str(i), text=c, embedding=e) for i, (c, e) in enumerate(zip(chunks, embeddings))])
+    base = Path(tempfile.mkdtemp()) / "bench"
+    write_lexical_index(base, chunks)
+    service.lexical = open_lexical_view([(base, slice(0, len(chunks)))])
+    print(f"indexed {len(chunks)} chunks in {time.perf_counter() - started:.1f}s")
+
+    # Questions made of words from random chunks, so both rankings find something
+    questions: List[str] = []
+    for _ in range(args.queries):
+        words = rng.choice(chunks).split()
+        questions.append("what is " + " ".join(rng.sample(words, min(6, len(words)))))
+
+    def ask(question: str) -> float:
+        t0 = time.perf_counter()
+        query_vec = service.embed_query(question)
+        if query_vec is not None:
+            service.search_hybrid(question, query_vec, args.top_k)
+        return time.perf_counter() - t0
+
+    print(f"\n{'threads':>8}{'qps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for threads in args.concurrency:
+        # Repeated questions would be served by the query embedding cache
+        batch = [f"{q} #{threads}" for q in questions]
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            latencies = np.array(list(pool.map(ask, batch))) * 1000
+        elapsed = time.perf_counter() - t0
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        print(f"{threads:>8}{len(batch) / elapsed:>10.0f}{p50:>10.2f}{p95:>10.2f}{p99:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Retrieval benchmark: prompt tokens sent vs. answer-grounding recall.
+
+For every question the top 100 chunks are retrieved once. Each selection
+strategy then picks the prompt context from them:
+
+* ``score``: the best-scored prefix that fits the budget (the old behaviour)
+* ``mmr``: MMR re-ranking with near-duplicate suppression
+
+Grounding recall is the share of a question's evidence sentences that appear
+verbatim (ignoring case and whitespace) in the selected context.
+
+Usage:
+    python benchmarks/retrieval_selection.py                   # synthetic corpus, no API calls
+    python benchmarks/retrieval_selection.py --eval qa.jsonl   # indexed documents
+
+Each ``--eval`` line is
+``{"file_id", "from_page", "to_page", "question", "evidence": [..]}``. The
+pages must already be indexed, and this mode embeds the questions through the
+configured provider.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import sys
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from assistance.context_selection import select_context  # noqa: E402
+from assistance.embeddings import Document, EmbeddingsService  # noqa: E402
+from assistance.lexical_index import tokenize  # noqa: E402
+from assistance.token_counter import count_tokens, fit_to_budget  # noqa: E402
+
+TOP_K = 100
+BUDGETS = (2000, 4000, 6000, 12000)
+LAMBDAS = (0.5, 0.7, 0.9)
+
+Case = Tuple[List[Tuple[Document, float]], np.ndarray | None, List[str]]
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+def _recall(context: Sequence[str], evidence: Sequence[str]) -> float:
+    joined = _normalize(" ".join(context))
+    return sum(_normalize(e) in joined for e in evidence) / len(evidence) if evidence else 1.0
+
+
+# ---------------------------------------------------------------------------
+# Synthetic corpus: repetitive textbook, hashed bag-of-words embeddings
+# ---------------------------------------------------------------------------
+def _hash_embed(text: str, dim: int = 256) -> np.ndarray:
+    vec = np.zeros(dim, dtype=np.float32)
+    for token in tokenize(text):
+        vec[int(hashlib.md5(token.encode()).hexdigest()[:8], 16) % dim] += 1.0
+    return vec
+
+
+def _synthetic_cases() -> List[Case]:
+    rng = random.Random(0)
+    vocab = [f"w{i}" for i in range(3000)]
+    topics = [f"topic{t}" for t in range(30)]
+    chunks: List[str] = []
+    evidence: Dict[str, List[str]] = {}
+    for topic in topics:
+        facts = [f"The {attr} of {topic} equals {rng.randint(10, 999)}." for attr in ("mass", "length", "charge")]
+        evidence[topic] = facts
+        # A recap page repeated with tiny edits, as repetitive textbooks do
+        recap = [topic if i % 10 == 0 else rng.choice(vocab) for i in range(150)]
+        for _ in range(8):
+            copy = list(recap)
+            for i in rng.sample(range(150), 3):
+                copy[i] = rng.choice(vocab)
+            chunks.append(" ".join(copy) + ".")
+        for fact in facts:
+            words = [topic if i % 25 == 0 else rng.choice(vocab) for i in range(150)]
+            chunks.append(" ".join(words[:75]) + f". {fact} " + " ".join(words[75:]) + ".")
+    docs = [Document(id=str(i), text=t, embedding=_hash_embed(t, 1024)) for i, t in enumerate(chunks)]
+    service = EmbeddingsService()
+    service.build_index(docs)
+
+    cases: List[Case] = []
+    for topic in topics:
+        query_vec = _hash_embed(f"what are the mass length and charge of {topic}", 1024)
+        query_vec /= np.linalg.norm(query_vec)
+        cases.append((service.search_by_vector(query_vec, TOP_K), query_vec, evidence[topic]))
+    return cases
+
+
+def _eval_cases(path: str) -> List[Case]:
+    from assistance.document_processor import document_processor_singleton as processor
+
+    cases: List[Case] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            service = processor.get_embeddings_service(item["file_id"], item["from_page"], item["to_page"])
+            if service is None:
+                print(f"skipping {item['file_id']} {item['from_page']}-{item['to_page']}: not indexed")
+                continue
+            query_vec = service.embed_query(item["question"])
+            if query_vec is not None and service.lexical is not None:
+                hits = service.search_hybrid(item["question"], query_vec, TOP_K)
+            elif query_vec is not None:
+                hits = service.search_by_vector(query_vec, TOP_K)
+            else:
+                hits = service.search_lexical(item["question"], TOP_K)
+            cases.append((hits, query_vec, item["evidence"]))
+    return cases
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--eval", help="JSONL file with questions and evidence")
+    args = parser.parse_args()
+
+    cases = _eval_cases(args.eval) if args.eval else _synthetic_cases()
+    if not cases:
+        sys.exit("No evaluable questions")
+    counts = [
+        [doc.token_count if doc.token_count is not None else count_tokens(doc.text) for doc, _ in hits]
+        for hits, _, _ in cases
+    ]
+
+    strategies = [(f"score budget={b}", "score", b, None) for b in BUDGETS]
+    strategies += [(f"mmr   budget={b} lambda={l}", "mmr", b, l) for b in BUDGETS for l in LAMBDAS]
+    print(f"{len(cases)} questions, top {TOP_K} candidates each\n")
+    print(f"{'strategy':<34}{'avg tokens':>12}{'avg chunks':>12}{'recall':>9}")
+    for label, kind, budget, mmr_lambda in strategies:
+        tokens, chunks, recall = [], [], []
+        for (hits, query_vec, evidence), token_counts in zip(cases, counts):
+            if kind == "score":
+                positions = list(range(fit_to_budget(token_counts, budget)))
+            else:
+                positions = select_context(hits, token_counts, budget, query_vec, mmr_lambda=mmr_lambda)
+            tokens.append(sum(token_counts[i] for i in positions))
+            chunks.append(len(positions))
+            recall.append(_recall([hits[i][0].text for i in positions], evidence))
+        print(f"{label:<34}{np.mean(tokens):>12.0f}{np.mean(chunks):>12.1f}{np.mean(recall):>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark of the in-house chunker in ``assistance/text_splitter.py``.
+
+Reports the import time of the old langchain splitter and of the new
+module (each in a fresh interpreter), chunks/second for langchain, the
+compat mode and the token mode, and checks that compat mode reproduces
+langchain's chunks on the corpus. langchain is only needed for the
+comparison columns; without it they are skipped.
+
+Usage:
+    python benchmarks/text_chunking.py [corpus ...]
+
+A corpus entry is a .txt file, a ``*_pages.jsonl`` / ``*_full_text.json``
+page file from ``uploads/``, or a directory of those. Without arguments a
+synthetic mixed Russian/English text is used.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from assistance.page_extraction import load_page_texts  # noqa: E402
+from assistance.text_splitter import iter_compat_chunks, iter_token_chunks  # noqa: E402
+from core.config import get_settings  # noqa: E402
+
+_SEPARATORS = ["\n\n", "\n", ".", "!", "?", ";", ":", " ", ""]
+
+
+def _load_corpus(paths: List[str]) -> List[str]:
+    texts: List[str] = []
+    for path in map(Path, paths):
+        files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+        for f in files:
+            if f.suffix in (".jsonl", ".json"):
+                texts.extend(load_page_texts(str(f)))
+            elif f.suffix == ".txt":
+                texts.append(f.read_text(encoding="utf-8", errors="replace"))
+    return texts
+
+
+def _synthetic_corpus(pages: int = 300) -> List[str]:
+    rng = random.Random(0)
+    words = "книга глава теорема доказательство the proof of a lemma follows from section".split()
+    result = []
+    for _ in range(pages):
+        sentences = [
+            " ".join(rng.choice(words) for _ in range(rng.randint(5, 25))).capitalize() + rng.choice(".!?;:")
+            for _ in range(rng.randint(20, 40))
+        ]
+        paragraphs = [" ".join(sentences[i : i + 6]) for i in range(0, len(sentences), 6)]
+        result.append("\n\n".join(paragraphs))
+    return result
+
+
+def _import_ms(statement: str) -> float:
+    """Median wall time of a fresh interpreter running ``statement``, minus a bare one."""
+    def run(code: str) -> float:
+        times = []
+        for _ in range(5):
+            started = time.perf_counter()
+            subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True, capture_output=True)
+            times.append(time.perf_counter() - started)
+        return sorted(times)[len(times) // 2]
+
+    return 1000 * (run(statement) - run("pass"))
+
+
+def _rate(split: Callable[[str], List[str]], texts: List[str]) -> tuple:
+    started = time.perf_counter()
+    chunks = sum(len(split(t)) for t in texts)
+    elapsed = time.perf_counter() - started
+    return chunks, chunks / elapsed if elapsed else float("inf")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", nargs="*")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    texts = _load_corpus(args.corpus) if args.corpus else _synthetic_corpus()
+    print(f"{len(texts)} pages, {sum(map(len, texts))} characters\n")
+
+    try:
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+    except ImportError:
+        RecursiveCharacterTextSplitter = None
+
+    print("import time (ms, fresh interpreter)")
+    if RecursiveCharacterTextSplitter is not None:
+        print(f"  langchain_text_splitters    {_import_ms('import langchain_text_splitters'):8.1f}")
+    print(f"  assistance.text_splitter    {_import_ms('import assistance.text_splitter'):8.1f}\n")
+
+    size, overlap = settings.chunk_size, settings.chunk_overlap
+    rows = [
+        ("compat", lambda t: list(iter_compat_chunks(t, size, overlap))),
+        (
+            "tokens",
+            lambda t: list(iter_token_chunks(t, settings.chunk_size_tokens, settings.chunk_overlap_tokens)),
+        ),
+    ]
+    if RecursiveCharacterTextSplitter is not None:
+        def langchain_split(t: str) -> List[str]:
+            # Built per call, as the old split_text_into_chunks did
+            splitter = RecursiveCharacterTextSplitter(
+                chunk_size=size, chunk_overlap=overlap, length_function=len, separators=_SEPARATORS
+            )
+            return [c.strip() for c in splitter.split_text(t) if c.strip()]
+
+        rows.insert(0, ("langchain", langchain_split))
+        mismatched = sum(langchain_split(t) != list(iter_compat_chunks(t, size, overlap)) for t in texts)
+        print(f"compat mode differs from langchain on {mismatched} of {len(texts)} pages\n")
+
+    print(f"{'splitter':<12}{'chunks':>10}{'chunks/s':>14}")
+    for name, split in rows:
+        chunks, rate = _rate(split, texts)
+        print(f"{name:<12}{chunks:>10}{rate:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,12 @@
 """Chat-related database models and helper functions."""
 
+import base64
 import json
-from typing import Any, Dict, List, Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 import uuid
 
+from sqlalchemy import tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
@@ -45,6 +48,21 @@ async def add_message(
     await session.commit()
 
 
+def format_message(m: Message) -> Dict[str, Any]:
+    """Message row as an OpenAI chat message dict (plus its ``id``)."""
+    entry: Dict[str, Any] = {"role": m.role}
+    if m.role == "tool":
+        try:
+            payload = json.loads(m.content) if m.content else {}
+        except json.JSONDecodeError:
+            payload = {"content": m.content}
+        entry |= payload
+    else:
+        entry["content"] = m.content or ""
+    entry["id"] = m.id
+    return entry
+
+
 async def get_history(
     session: AsyncSession, chat_id: str, user_id: str
 ) -> List[Dict[str, Any]]:
@@ -58,22 +76,69 @@ async def get_history(
     )
     messages = result.scalars().all()
 
-    formatted: List[Dict[str, Any]] = []
-    for m in messages:
-        entry: Dict[str, Any] = {"role": m.role}
-        if m.role == "tool":
-            try:
-                payload = json.loads(m.content) if m.content else {}
-            except json.JSONDecodeError:
-                payload = {"content": m.content}
-            entry |= payload
-        else:
-            entry["content"] = m.content or ""
-        entry["id"] = m.id
-        formatted.append(entry)
-
     # Return while session is still open, but data is detached-friendly (pure dict)
-    return formatted
+    return [format_message(m) for m in messages]
+
+
+def encode_cursor(m: Message) -> str:
+    """Opaque pagination cursor for a message position (created_at, id)."""
+    raw = f"{m.created_at.isoformat()}|{m.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of ``encode_cursor``; raises ValueError for malformed cursors."""
+    try:
+        created_at, message_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), message_id
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+async def get_history_page(
+    session: AsyncSession,
+    chat_id: str,
+    user_id: str,
+    limit: int,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Keyset page of chat history in chronological order.
+
+    Without a cursor the newest ``limit`` messages are returned; ``before``
+    pages towards older messages and ``after`` towards newer ones. Each page
+    carries the cursors for the adjacent pages (None when there is nothing more).
+    """
+    position = tuple_(Message.created_at, Message.id)
+    query = select(Message).join(Chat).where(Message.chat_id == chat_id, Chat.user_id == user_id)
+    if after is not None:
+        query = query.where(position > tuple_(*decode_cursor(after)))
+        query = query.order_by(Message.created_at.asc(), Message.id.asc())
+    else:
+        if before is not None:
+            query = query.where(position < tuple_(*decode_cursor(before)))
+        query = query.order_by(Message.created_at.desc(), Message.id.desc())
+    result = await session.execute(query.limit(limit + 1))
+    messages = result.scalars().all()
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    if after is None:
+        messages = messages[::-1]
+
+    older = newer = None
+    if messages:
+        # A page reached through a cursor always has a neighbour on the side it came from
+        if after is None:
+            older = encode_cursor(messages[0]) if has_more else None
+            newer = encode_cursor(messages[-1]) if before is not None else None
+        else:
+            older = encode_cursor(messages[0])
+            newer = encode_cursor(messages[-1]) if has_more else None
+    return {
+        "messages": [format_message(m) for m in messages],
+        "older_cursor": older,
+        "newer_cursor": newer,
+    }
 
 
 # Public helper to explicitly create a chat
@@ -20,6 +20,10 @@ class Settings(BaseSettings):
     # --- Google Custom Search ---
     google_api_key: str | None = None
     google_cx_id: str | None = None
+    # Shared cache of search results by (query, search type); identical concurrent queries share a request
+    google_search_cache_ttl_seconds: int = 3600
+    google_search_cache_max_entries: int = 5000
+    google_search_timeout_seconds: float = 10.0
 
     # --- Google OAuth ---
     google_client_id: str | None = None
@@ -27,14 +31,98 @@ class Settings(BaseSettings):
     # --- File upload limits ---
     max_file_size_mb: int = 10
     allowed_extensions: List[str] = ["pdf", "txt"]
+    # PDF text extraction: worker processes and pages per worker task
+    pdf_extraction_workers: int = 4
+    pdf_extraction_batch_pages: int = 16
+    # "auto" (chosen per document), "pymupdf" or "pdfplumber"
+    pdf_extractor: str = "auto"
 
     # --- Embeddings / chunking ---
+    # Gemini model ("models/...") or the offline deterministic "local/hashed-ngram-<dim>"
     embedding_model: str = "models/embedding-001"
+    # Model used to index a document when embedding_model fails (e.g. "local/hashed-ngram-768");
+    # such documents are re-embedded with embedding_model once it works again. None disables it.
+    embedding_fallback_model: str | None = None
+    # Model of the whole-range pickle indexes written before indexes recorded their model
+    legacy_embedding_model: str = "models/embedding-001"
     chunk_size: int = 1000
     chunk_overlap: int = 50
+    # "compat": chunk_size/chunk_overlap characters, same boundaries as before;
+    # "tokens": sentence-aligned chunks of chunk_size_tokens with chunk_overlap_tokens overlap
+    chunking_mode: str = "compat"
+    chunk_size_tokens: int = 256
+    chunk_overlap_tokens: int = 32
+    # Texts per batchEmbedContents request (API limit is 100)
+    embedding_batch_size: int = 100
+    # Batches embedded in parallel and retry attempts on throttling
+    embedding_max_concurrency: int = 4
+    embedding_max_retries: int = 5
+    # Indexing jobs checkpoint progress after every this many embedded chunks
+    indexing_checkpoint_chunks: int = 200
+    # After embedding_model changes, documents are re-embedded in the background
+    # (most queried first), capped at reembedding_chunks_per_minute
+    reembedding_enabled: bool = True
+    reembedding_chunks_per_minute: int = 600
+    reembedding_interval_seconds: int = 300
+    # Per-document query counters that order re-embedding (entries, seconds since last query)
+    access_stats_max_entries: int = 10000
+    access_stats_ttl_seconds: int = 7 * 86400
+    # Search copy of the index: "float32" (none), "float16" or "int8";
+    # compact copies rescore rescore_factor * top_k candidates at full precision
+    embedding_index_dtype: str = "float32"
+    embedding_rescore_factor: int = 4
+    # Memory budget of the in-process LRU of loaded indexes
+    index_cache_max_mb: int = 512
+    # Cache of question embeddings (entries, seconds)
+    query_cache_max_entries: int = 10000
+    query_cache_ttl_seconds: int = 3600
+    # Semantic answer cache: min cosine similarity between questions, TTL, size per document range
+    answer_cache_threshold: float = 0.95
+    answer_cache_ttl_seconds: int = 86400
+    answer_cache_max_entries_per_scope: int = 500
+    # IVF lists probed per query in the per-user library index
+    library_nprobe: int = 8
+
+    # Retrieval: "hybrid" (dense + BM25), "dense" or "lexical" (no embedding call).
+    # Query embedding deadline; on timeout or error retrieval falls back to BM25.
+    retrieval_mode: str = "hybrid"
+    embedding_query_timeout_seconds: float = 5.0
+    # Concurrent Gemini generation / embedding requests per process; extra requests queue
+    llm_max_concurrency: int = 16
+    embedding_request_max_concurrency: int = 32
+
+    # --- OpenAI chat client: one pooled connection pool per process ---
+    openai_base_url: str | None = None
+    openai_max_connections: int = 512
+    openai_max_keepalive_connections: int = 64
+    openai_connect_timeout_seconds: float = 10.0
+    # Max silence between streamed chunks
+    openai_read_timeout_seconds: float = 60.0
+    # Max wait for a free pooled connection
+    openai_pool_timeout_seconds: float = 30.0
+    openai_max_retries: int = 2
+
+    # Chat agent tools (web search, image generation): worker threads and per-call timeouts
+    tool_max_workers: int = 32
+    tool_timeout_seconds: float = 15.0
+    image_tool_timeout_seconds: float = 60.0
 
     # --- LLM context limit ---
     max_context_tokens: int = 12000
+    # General chat history per turn: the chat's rolling summary plus the newest messages
+    # within chat_history_token_budget (at most chat_history_max_messages are read);
+    # messages that drop out are summarized in the background, chat_summary_batch_messages at a time
+    chat_history_token_budget: int = 3000
+    chat_history_max_messages: int = 50
+    chat_summary_model: str = "gpt-4o-mini"
+    chat_summary_max_tokens: int = 600
+    chat_summary_batch_messages: int = 20
+    # Prompt context after retrieval: "mmr" (diverse, near-duplicates dropped) or "score"
+    # (best-scored prefix). MMR fills at most context_token_budget (capped by max_context_tokens).
+    context_selection: str = "mmr"
+    context_token_budget: int = 6000
+    mmr_lambda: float = 0.9
+    context_duplicate_threshold: float = 0.92
 
     # --- Storage ---
     upload_dir: str = "uploads"
@@ -4,7 +4,7 @@ from typing import AsyncGenerator, List, Optional
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlmodel import SQLModel, Field, Relationship
-from sqlalchemy import Column, Text, String, Integer, DateTime, Float, Boolean
+from sqlalchemy import Column, Text, String, Integer, DateTime, Float, Boolean, Index
 import uuid
 from datetime import datetime
 from dotenv import load_dotenv
@@ -103,10 +103,16 @@ class Chat(SQLModel, table=True):
     user_id: str = Field(foreign_key="users.id", index=True)
     name: str = Field(default="Новый чат")
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Rolling summary of the messages up to (summary_until, summary_until_id) (see assistance/chat_history.py)
+    summary: Optional[str] = Field(default=None, sa_column=Column(Text))
+    summary_until: Optional[datetime] = None
+    summary_until_id: Optional[str] = None
     messages: List["Message"] = Relationship(back_populates="chat", sa_relationship_kwargs={"cascade": "all, delete-orphan"})
     user: User = Relationship(back_populates="chats")
 
 class Message(SQLModel, table=True):
+    # Keyset pagination and history windows read a chat's messages in (created_at, id) order
+    __table_args__ = (Index("ix_message_chat_id_created_at", "chat_id", "created_at", "id"),)
     id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
     chat_id: str = Field(foreign_key="chat.id")
     chat: Chat = Relationship(back_populates="messages")
@@ -166,6 +172,22 @@ class Subscription(SQLModel, table=True):
     
     user: "User" = Relationship(back_populates="subscriptions")
 
+class IndexingJob(SQLModel, table=True):
+    """Durable record of one page-range indexing run and its progress."""
+    __tablename__ = "indexing_jobs"
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
+    file_id: str = Field(foreign_key="document.file_id", index=True)
+    from_page: int
+    to_page: int
+    status: str = Field(default="queued", index=True)  # queued, running, complete, failed
+    # "index": requested by a user; "reembed": migration to a new embedding model
+    kind: str = Field(default="index")
+    chunks_done: int = Field(default=0)
+    chunks_total: Optional[int] = None
+    error: Optional[str] = Field(default=None, sa_column=Column(Text))
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Регрессионный тест компактации сегментов страниц (assistance/page_segments.py).
+
+Два раза подряд компактируем сегменты, покрывающие один и тот же диапазон
+страниц: объединённый индекс должен оставаться на диске и открываться.
+
+Запуск: python -m pytest test_page_segments.py  (или python test_page_segments.py)
+"""
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+import assistance.vector_index as vector_index
+from assistance.page_segments import PageSegmentStore
+
+MODEL = "models/embedding-001"
+
+
+def _add_page(store: PageSegmentStore, page: int) -> None:
+    texts = [f"page {page} chunk {i}" for i in range(2)]
+    vectors = [np.full(4, page + i, dtype=np.float32) for i in range(2)]
+    store.add_segment("doc", MODEL, (page, page), texts, vectors, [page, page])
+
+
+def _word_counts(texts):
+    # Token counts need the tiktoken vocabulary download; word counts do here
+    return [len(t.split()) for t in texts]
+
+
+def test_compacting_twice_over_same_span_keeps_index(monkeypatch=None):
+    if monkeypatch is not None:
+        monkeypatch.setattr(vector_index, "count_tokens_many", _word_counts)
+    else:
+        vector_index.count_tokens_many = _word_counts
+    with tempfile.TemporaryDirectory() as tmp:
+        store = PageSegmentStore(Path(tmp))
+        # 9 single-page segments over pages 1..17 trigger the first compaction
+        for page in range(1, 18, 2):
+            _add_page(store, page)
+        assert len(store.segments("doc", MODEL)) == 1
+        # Filling the gaps compacts the same 1..17 span once more
+        for page in range(2, 17, 2):
+            _add_page(store, page)
+        assert len(store.segments("doc", MODEL)) == 1
+
+        assert store.missing_runs("doc", MODEL, 1, 17) == []
+        parts = store.open_range("doc", MODEL, 1, 17)
+        assert parts is not None
+        assert store.chunk_count("doc", MODEL, 1, 17) == 34
+        pages = [int(p) for index, rows in parts for p in index.pages[rows]]
+        assert pages == sorted(pages) and set(pages) == set(range(1, 18))
+
+
+def test_range_over_merged_segment_with_gaps_is_in_page_order(monkeypatch=None):
+    if monkeypatch is not None:
+        monkeypatch.setattr(vector_index, "count_tokens_many", _word_counts)
+    else:
+        vector_index.count_tokens_many = _word_counts
+    with tempfile.TemporaryDirectory() as tmp:
+        store = PageSegmentStore(Path(tmp))
+        # Odd pages are merged into one segment with gaps; page 2 fills one of them
+        for page in range(1, 18, 2):
+            _add_page(store, page)
+        _add_page(store, 2)
+        assert len(store.segments("doc", MODEL)) == 2
+
+        parts = store.open_range("doc", MODEL, 1, 3)
+        assert parts is not None
+        pages = [int(p) for index, rows in parts for p in index.pages[rows]]
+        assert pages == [1, 1, 2, 2, 3, 3]
+
+
+if __name__ == "__main__":
+    test_compacting_twice_over_same_span_keeps_index()
+    test_range_over_merged_segment_with_gaps_is_in_page_order()
+    print("ok")